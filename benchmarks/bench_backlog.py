@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Latency of the backlog query by table size, with the schema before (version 3) and after (version 4)
+the indexes of migration 4. The query is the one of those versions, the retry state came later.
+
+Usage:
+    python benchmarks/bench_backlog.py [SIZES...]
+
+Created: 18.10.26
+"""
+
+import sys
+import sqlite3
+from time import perf_counter
+from datetime import datetime, timedelta
+
+from luechenbresse import migrations
+
+# same as Feed._get_backlog up to version 8
+BACKLOG_SQL = """
+    SELECT url, ts, title FROM articles
+    WHERE ( dl_http != 200 OR dl_http IS NULL ) AND url != ''
+    ORDER BY ts
+"""
+
+PENDING_EVERY = 50  # 2% of the articles wait for download
+REPEAT = 20
+
+
+def fill(conn, n):
+    t0 = datetime(2020, 5, 1)
+    rows = list()
+    for k in range(n):
+        ts = (t0 + timedelta(minutes=17 * k)).isoformat()
+        http = None if k % PENDING_EVERY == 0 else 200
+        rows.append((f"https://example.com/{k}", str(k), f"Artikel {k}", ts, ts, ts, http, 0.1, "<html/>" * 100))
+    conn.executemany("""
+        INSERT INTO articles(url, rss_id, title, ts, realised_ts, dl_ts, dl_http, dl_dt, html)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+
+def measure(conn):
+    best = None
+    for _ in range(REPEAT):
+        pc = perf_counter()
+        conn.execute(BACKLOG_SQL).fetchall()
+        dt = perf_counter() - pc
+        best = dt if best is None else min(best, dt)
+    return best * 1000.0
+
+def plan(conn):
+    return "; ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + BACKLOG_SQL))
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [1_000, 10_000, 100_000, 300_000]
+    print(f"{'rows':>9} {'v3 [ms]':>9} {'v4 [ms]':>12}  plan (v4)")
+    for n in sizes:
+        old = sqlite3.connect(":memory:")
+        migrations.migrate(old, target=3)
+        fill(old, n)
+        new = sqlite3.connect(":memory:")
+        migrations.migrate(new, target=4)
+        fill(new, n)
+        print(f"{n:9d} {measure(old):9.2f} {measure(new):12.2f}  {plan(new)}")
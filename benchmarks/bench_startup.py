@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Wall time of common luechenbresse commands that do not touch the network, against a budget.
+Exits with 1 when a command is over budget.
+
+Usage:
+    python benchmarks/bench_startup.py [REPEAT]
+
+Created: 18.10.26
+"""
+
+import sys
+import subprocess
+from pathlib import Path
+from time import perf_counter
+
+SCRIPT = Path(__file__).resolve().parent.parent / "bin" / "luechenbresse"
+
+# command line -> budget in ms (best of REPEAT runs)
+BUDGETS = {
+    "--version": 150,
+    "--help": 150,
+    "--stats": 200,
+}
+
+
+def best_of(args, repeat):
+    best = None
+    for _ in range(repeat):
+        pc = perf_counter()
+        subprocess.run([sys.executable, str(SCRIPT)] + args, capture_output=True, check=True)
+        dt = (perf_counter() - pc) * 1000.0
+        best = dt if best is None else min(best, dt)
+    return best
+
+def importtime(args):
+    # the slowest imports as reported by python -X importtime
+    r = subprocess.run([sys.executable, "-X", "importtime", str(SCRIPT)] + args, capture_output=True, text=True)
+    rows = list()
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [x.strip() for x in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:5]
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    over = False
+    for cmd, budget in BUDGETS.items():
+        dt = best_of(cmd.split(), repeat)
+        status = "ok" if dt <= budget else "OVER BUDGET"
+        over = over or dt > budget
+        print(f"luechenbresse {cmd:12} {dt:7.1f} ms (budget {budget} ms) {status}")
+        for us, name in importtime(cmd.split()):
+            print(f"    {us / 1000.0:7.1f} ms  {name}")
+    raise SystemExit(1 if over else 0)
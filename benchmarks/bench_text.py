@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+text.join() against the recursive undecorate/flatten it replaced, on a nested article.
+Exits with 1 when join() is slower.
+
+Usage:
+    python benchmarks/bench_text.py [REPEAT]
+
+Created: 18.10.26
+"""
+
+import sys
+from timeit import timeit
+
+from luechenbresse import text
+
+ARTICLE = [["Titel: Kim Jong Un", ["Absatz eins, mit Text.", ["Zitat „so“ oder so."]]] * 20] * 20
+NUMBER = 5
+
+
+# the recursive implementation before words()
+def undecorate(mixup):
+    if isinstance(mixup, list) or isinstance(mixup, tuple):
+        l = [undecorate(s) for s in mixup]
+    else:
+        l = [word.strip(text._DECORATORS) for word in mixup.split(" ") if word != ""]
+    return [e for e in l if e != ""]
+
+def flatten(mixup):
+    if isinstance(mixup, str):
+        return mixup
+    l = list()
+    for y in mixup:
+        f = flatten(y)
+        if isinstance(f, str):
+            l.append(f)
+        else:
+            l.extend(flatten(y))
+    return l
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    old = lambda: flatten(undecorate(ARTICLE))
+    new = lambda: text.join(ARTICLE)
+    assert old() == new()
+    t_old = min(timeit(old, number=NUMBER) for _ in range(repeat)) / NUMBER * 1000.0
+    t_new = min(timeit(new, number=NUMBER) for _ in range(repeat)) / NUMBER * 1000.0
+    print(f"join: recursive {t_old:0.2f} ms, streaming {t_new:0.2f} ms per article")
+    sys.exit(0 if t_new <= t_old else 1)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Interface between Feed and the feed specific code.
+A feed module (luechenbresse/<name>.py, or any module named in [feed:NAME] module = ...) defines
+a subclass of FeedAdapter called Adapter; mostly the CSS selectors for the article text are enough.
+Other packages can bring their own feeds with an entry point in the group luechenbresse.adapters:
+    entry_points={"luechenbresse.adapters": ["spiegel = mypackage.spiegel:Adapter"]}
+Older modules with functions parse_feed_header, parse_feed_entry and parse_article still work.
+
+Created: 18.10.26
+"""
+
+import importlib
+from datetime import datetime
+from time import mktime
+from typing import NamedTuple
+import logging
+
+from luechenbresse import extract
+
+ENTRY_POINT_GROUP = "luechenbresse.adapters"
+
+
+class Entry(NamedTuple):
+    url: str
+    rss_id: str
+    title: str
+    ts: str         # iso timestamp
+
+
+def iso(t):
+    """
+    struct_time (like feedparser's *_parsed) -> iso timestamp, the convention of all articles.ts so far:
+    mktime takes the UTC fields for local time and fromtimestamp converts back to local time, so with
+    tm_isdst = 0 summer timestamps are shifted by the DST offset of this machine. Kept for consistent
+    ORDER BY ts and calweeks across the archive.
+    """
+    if t is None:
+        return None
+    return datetime.fromtimestamp(mktime(t)).isoformat()
+
+
+class FeedAdapter:
+    """
+    Defaults for a RSS feed read with feedparser and articles with title and paragraphs.
+    """
+
+    # increment when parse_article changes, already parsed articles will be parsed again
+    PARSER_VERSION = 1
+    # key of the publishing time in the feed header
+    HEADER_PUBLISHED = "published"
+    # CSS selectors, the first one matching wins
+    TITLE = ["h1"]
+    PARAGRAPHS = ["article p"]
+    # archive index page per day like "https://example.com/archiv?datum={day}", None: no archive
+    ARCHIVE_URL = None
+    ARCHIVE_LINKS = ["main a[href$='.html']"]
+
+    def parse_feed_header(self, feed_header):
+        return feed_header.get("title"), feed_header.get(self.HEADER_PUBLISHED)
+
+    def normalize(self, entries):
+        """
+        All entries of a feed (feedparser or feedstream dicts) in one go -> list of Entry
+        Entries without publishing time are dated by their last update.
+        """
+        return [
+            Entry(e.get("link") or "", e.get("id"), e.get("title"),
+                  iso(e.get("published_parsed") or e.get("updated_parsed")))
+            for e in entries
+        ]
+
+    def parse_article(self, html):
+        # -> nested list of strings (title, paragraphs), dict of meta data
+        doc = extract.soup(html)
+        title = extract.meta(doc, "og:title") or extract.first_text(doc, self.TITLE)
+        paragraphs = extract.texts(doc, self.PARAGRAPHS)
+        meta = {
+            "description": extract.meta(doc, "og:description", "description"),
+            "published": extract.meta(doc, "article:published_time", "date"),
+        }
+        return [title or "", paragraphs], meta
+
+    def archive_url(self, day):
+        # day: datetime.date
+        return self.ARCHIVE_URL.format(day=day.isoformat()) if self.ARCHIVE_URL else None
+
+    def parse_archive_page(self, html, url, day):
+        """
+        Articles listed on the archive page of day -> list of Entry, all dated at midnight of that day
+        """
+        ts = f"{day.isoformat()}T00:00:00"
+        links = extract.links(extract.soup(html), self.ARCHIVE_LINKS, url)
+        return [Entry(link, None, title, ts) for link, title in links]
+
+
+class ModuleAdapter(FeedAdapter):
+    """
+    For modules with the functions parse_feed_header, parse_feed_entry and parse_article.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self.PARSER_VERSION = getattr(module, "PARSER_VERSION", 1)
+
+    def __reduce__(self):
+        # modules do not pickle, for the worker processes of parse.py
+        return _module_adapter, (self.module.__name__,)
+
+    def parse_feed_header(self, feed_header):
+        return self.module.parse_feed_header(feed_header)
+
+    def normalize(self, entries):
+        parse_feed_entry = self.module.parse_feed_entry
+        return [Entry(*parse_feed_entry(e)) for e in entries]
+
+    def parse_article(self, html):
+        return self.module.parse_article(html)
+
+def _module_adapter(module_name):
+    return ModuleAdapter(importlib.import_module(module_name))
+
+
+def entry_points():
+    # name -> entry point of all installed adapters
+    try:
+        from importlib.metadata import entry_points as _entry_points
+    except ImportError:     # Python 3.7
+        return dict()
+    eps = _entry_points()
+    if hasattr(eps, "select"):
+        eps = eps.select(group=ENTRY_POINT_GROUP)
+    else:
+        eps = eps.get(ENTRY_POINT_GROUP, [])
+    return {ep.name: ep for ep in eps}
+
+def adapter_from(obj, name):
+    # FeedAdapter subclass, module with class Adapter or old style module -> FeedAdapter instance
+    if isinstance(obj, type) and issubclass(obj, FeedAdapter):
+        return obj()
+    if isinstance(getattr(obj, "Adapter", None), type) and issubclass(obj.Adapter, FeedAdapter):
+        return obj.Adapter()
+    if all(hasattr(obj, f) for f in ("parse_feed_header", "parse_feed_entry")):
+        return ModuleAdapter(obj)
+    raise ValueError(f"{name}: {obj} is no feed adapter")
+
+def load(name, module_name=None, eps=None):
+    """
+    Adapter of feed <name>: from module_name if given, else from an entry point of that name,
+    else from luechenbresse.<name>.
+    """
+    if module_name is None:
+        eps = entry_points() if eps is None else eps
+        if name in eps:
+            logging.info(f"loading adapter {eps[name].value}")
+            return adapter_from(eps[name].load(), name)
+        module_name = f"luechenbresse.{name}"
+    logging.info(f"loading module {module_name}")
+    return adapter_from(importlib.import_module(module_name), name)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Backfill from the archive of a feed (luechenbresse --archive FEED --from DATE): one index page per day,
+the article URLs found there go into articles like new RSS entries and are downloaded with the backlog.
+Days crawled completely are kept in archive_days and skipped next time, so an interrupted crawl just
+starts again. The index pages are fetched through the Downloader (rate limit per host, bounded concurrency).
+Only feeds whose adapter has an ARCHIVE_URL have an archive (so far ard-tagesschau).
+
+Created: 18.10.26
+"""
+
+from datetime import date, datetime, timedelta
+import logging
+
+from luechenbresse import metrics
+from luechenbresse.download import Downloader
+
+DONE_SQL = "SELECT day FROM archive_days WHERE day >= ? AND day < ?"
+DAY_SQL = "INSERT OR REPLACE INTO archive_days(day, url, found, new, ts) VALUES (?, ?, ?, ?, ?)"
+
+
+def days(date_from, date_to):
+    # iso dates, date_to exclusive -> list of dates
+    d0 = date.fromisoformat(date_from[:10])
+    d1 = date.fromisoformat(date_to[:10])
+    return [d0 + timedelta(days=k) for k in range((d1 - d0).days)]
+
+def crawl(feed, date_from, date_to=None, downloader=None):
+    """
+    Crawl the archive of an opened or unopened Feed from date_from up to date_to (exclusive, default today).
+    Returns (pages crawled, new articles).
+    """
+    if not feed.adapter.ARCHIVE_URL:
+        raise ValueError(f"{feed.name} has no archive")
+    date_to = date_to or date.today().isoformat()
+    private_connection = False
+    if not feed.cur:
+        private_connection = True
+        feed._open_db()
+    pages, new = 0, 0
+    try:
+        done = {row[0] for row in feed.conn.execute(DONE_SQL, (date_from[:10], date_to[:10]))}
+        todo = [day for day in days(date_from, date_to) if day.isoformat() not in done]
+        logging.info(f"{feed.name}: {len(todo)} days to crawl, {len(done)} done before")
+        jobs = [(day, {"url": feed.adapter.archive_url(day)}) for day in todo]
+        downloader = downloader or Downloader(stage="archive")
+        for day, page, r in downloader.run(jobs):
+            if r.status_code != 200:
+                logging.warning(f"{feed.name}: HTTP {r.status_code} for {page['url']}, will be tried again next time")
+            else:
+                found, n = _store_page(feed, day, page["url"], r.text)
+                pages += 1
+                new += n
+                logging.info(f"{feed.name}: {day} {found} links, {n} new")
+    finally:
+        if private_connection:
+            feed._close_db()
+    metrics.count(feed.name, "archive", new)
+    logging.info(f"{feed.name}: {pages} archive pages, {new} new articles")
+    return pages, new
+
+def _store_page(feed, day, url, html):
+    entries = feed.adapter.parse_archive_page(html, url, day)
+    unique = {entry.url: entry for entry in entries if entry.url}
+    known = feed._known_urls(unique)
+    new_entries = [entry for u, entry in unique.items() if u not in known]
+    now = datetime.now().isoformat()[:19]
+    # the day counts as done together with its articles
+    with metrics.timer("db write", feed.name), feed.conn:
+        feed._upsert_articles(new_entries, realised=False)
+        feed.conn.execute(DAY_SQL, (day.isoformat(), url, len(unique), len(new_entries), now))
+    return len(unique), len(new_entries)
+
+def archive_feed(name, date_from, date_to=None):
+    from luechenbresse.feed import Feed
+    feed = Feed.from_name(name)
+    crawl(feed, date_from, date_to)
+    feed.process_backlog()
+
+
+if __name__ == "__main__":
+    pass
@@ -3,24 +3,23 @@
 
 """
 Special coding for the ard-tagesschau RSS feed.
-We can re-think the exit-mechanism later (class/interface, whatever...).
 
 Created: 10.05.20
 """
 
-from datetime import datetime
-from time import mktime
+from luechenbresse.adapter import FeedAdapter
 
-def parse_feed_header(feed_header):
-    return feed_header["title"], feed_header["updated"]
 
-def parse_feed_entry(feed_entry):
-    url = feed_entry["link"]
-    rss_id = feed_entry["id"]
-    title = feed_entry["title"]
-    ts = datetime.fromtimestamp(mktime(feed_entry["published_parsed"])).isoformat()
-    return url, rss_id, title, ts
+class Adapter(FeedAdapter):
+
+    # increment when the selectors change, already parsed articles will be parsed again
+    PARSER_VERSION = 1
+    HEADER_PUBLISHED = "updated"
+    TITLE = ["h1 .seitenkopf__headline--text", "h1 .headline", "h1"]
+    PARAGRAPHS = ["p.textabsatz", "div.storywrapper p.text", "article p"]
+    ARCHIVE_URL = "https://www.tagesschau.de/archiv?datum={day}"
+    ARCHIVE_LINKS = ["a.teaser-right__link", "a.teaser__link", "main a[href$='.html']"]
 
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Optional storage of raw article HTML outside the articles table.
+Pages go into html_blobs (see migrations), compressed and keyed by their SHA-256, so identical pages are stored once.
+articles.html stays NULL then and articles.html_ref holds the hash.
+Configuration in luechenbresse.ini:
+[storage]
+html = blob             inline (default) | blob
+codec = zlib            zlib (default) | zstd (needs the zstandard package)
+level = 6               compression level
+
+Created: 18.10.26
+"""
+
+import hashlib
+import zlib
+import logging
+
+from luechenbresse import ini
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+def compress(raw, codec, level):
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=level).compress(raw)
+    return zlib.compress(raw, level)
+
+def decompress(blob, codec):
+    if codec == "zstd":
+        return _zstd().ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+class HtmlStore:
+
+    def __init__(self, conn, mode=None, codec=None, level=None):
+        self.conn = conn
+        self.mode = mode or ini.get("storage", "html", "inline")
+        self.codec = codec or ini.get("storage", "codec", "zlib")
+        self.level = int(level or ini.get("storage", "level", 6))
+        if self.codec == "zstd" and not _zstd():
+            logging.warning("zstandard not installed, falling back to zlib")
+            self.codec = "zlib"
+
+    @property
+    def enabled(self):
+        return self.mode == "blob"
+
+    def put(self, html):
+        # returns the reference (hash) to be stored in articles.html_ref, None for no html
+        if html is None:
+            return None
+        raw = html.encode("utf-8")
+        ref = hashlib.sha256(raw).hexdigest()
+        cur = self.conn.cursor()
+        if cur.execute("SELECT 1 FROM html_blobs WHERE hash = ?", (ref,)).fetchone() is None:
+            blob = compress(raw, self.codec, self.level)
+            cur.execute("INSERT INTO html_blobs(hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                        (ref, self.codec, len(raw), blob))
+        return ref
+
+    def get(self, ref):
+        if ref is None:
+            return None
+        row = self.conn.execute("SELECT codec, data FROM html_blobs WHERE hash = ?", (ref,)).fetchone()
+        if row is None:
+            logging.warning(f"html blob {ref} missing")
+            return None
+        return decompress(row[1], row[0]).decode("utf-8")
+
+    def resolve(self, html, ref):
+        # html and html_ref like read from articles
+        return html if ref is None else self.get(ref)
+
+    def split(self, d):
+        # d: dict with key html, like used by FeedAPI; moves html to the store if enabled
+        d["html_ref"] = None
+        if self.enabled and d.get("html") is not None:
+            d["html_ref"] = self.put(d["html"])
+            d["html"] = None
+        return d
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Long running mode (luechenbresse --daemon) instead of a cron job running --get_all.
+Every feed is polled at its own interval, derived from how many articles it brought in lately
+(articles.realised_ts): about factor times the average gap between new articles, within min_interval
+and max_interval. The backlog is downloaded continuously at the rate limits of the Downloader, polls
+that are due run between two downloads; new articles and due retries join the backlog right away,
+the newest articles go first.
+Every stats_interval the metrics go to metrics.jsonl and the report of current.log is sent, current.log
+starts afresh. SIGTERM or Ctrl-C end the daemon after the running downloads: no new requests are sent,
+the responses of those already sent are stored and committed.
+Configuration in luechenbresse.ini (defaults shown):
+[daemon]
+min_interval = 300          seconds
+max_interval = 10800
+factor = 0.5
+window = 20                 articles considered for the interval
+stats_interval = 3600       seconds between two reports
+
+Created: 18.10.26
+"""
+
+import heapq
+import signal
+import threading
+from datetime import datetime
+from time import monotonic
+import logging
+
+from luechenbresse import ini
+from luechenbresse import metrics
+from luechenbresse import registry
+from luechenbresse.download import Downloader, interleave
+
+RECENT_SQL = """
+    SELECT realised_ts FROM articles
+    WHERE realised_ts IS NOT NULL
+    ORDER BY realised_ts DESC
+    LIMIT ?
+"""
+
+
+def poll_interval(realised, now, min_interval=300, max_interval=10800, factor=0.5):
+    """
+    realised: iso timestamps of the latest articles, newest first
+    The time since the oldest of them counts, so a feed that fell silent is polled less often.
+    """
+    if not realised:
+        return max_interval
+    span = (now - datetime.fromisoformat(realised[-1])).total_seconds()
+    gap = max(span, 0) / len(realised)
+    return min(max_interval, max(min_interval, factor * gap))
+
+
+class Daemon:
+
+    def __init__(self, feeds=None, downloader=None):
+        self.feeds = feeds if feeds is not None else registry.registry().feeds()
+        self.downloader = downloader
+        self.min_interval = float(ini.get("daemon", "min_interval", 300))
+        self.max_interval = float(ini.get("daemon", "max_interval", 10800))
+        self.factor = float(ini.get("daemon", "factor", 0.5))
+        self.window = int(ini.get("daemon", "window", 20))
+        self.stats_interval = float(ini.get("daemon", "stats_interval", 3600))
+        self.stop = threading.Event()
+        self.schedule = list()
+        self.next_stats = None
+        self.fresh = False          # a poll found new articles, the backlog is read again
+        self.in_flight = set()      # URLs handed to the Downloader and not stored yet
+        self.downloads = 0
+
+    def interval(self, feed):
+        realised = [row[0] for row in feed.conn.execute(RECENT_SQL, (self.window,))]
+        return poll_interval(realised, datetime.now(), self.min_interval, self.max_interval, self.factor)
+
+    def _on_signal(self, signum, frame):
+        logging.warning(f"{signal.Signals(signum).name}: stopping after the running downloads")
+        self.stop.set()
+
+    def poll_due(self):
+        # polls the feeds whose time has come, between two downloads
+        while self.schedule and self.schedule[0][0] <= monotonic() and not self.stop.is_set():
+            _, k, feed = heapq.heappop(self.schedule)
+            try:
+                if feed.get_rss()["new"]:
+                    self.fresh = True
+            except Exception:
+                logging.exception(f"cannot poll {feed.name}")
+            dt = self.interval(feed)
+            logging.info(f"{feed.name}: next poll in {dt / 60:0.0f} min")
+            heapq.heappush(self.schedule, (monotonic() + dt, k, feed))
+
+    def stats_due(self):
+        # metrics and report of the last stats_interval, current.log starts afresh
+        if monotonic() < self.next_stats:
+            return
+        metrics.write(command="--daemon")
+        from luechenbresse.dotfolder import LogManager
+        if getattr(LogManager, "instance", None):
+            LogManager.instance.rotate("von luechenbresse --daemon")
+        metrics.reset()
+        self.next_stats = monotonic() + self.stats_interval
+
+    def backlog(self):
+        """
+        Jobs for the Downloader, all feeds interleaved, newest articles first. The backlog is read again
+        when it is used up or a poll found new articles, so fresh articles and due retries follow without
+        a pause. Ends when nothing is due.
+        """
+        while not self.stop.is_set():
+            self.fresh = False
+            jobs = list()
+            for feed in self.feeds:
+                backlog = [a for a in feed._get_backlog() if a["url"] not in self.in_flight]
+                backlog.sort(key=lambda a: a["ts"] or "", reverse=True)
+                jobs.append([(feed, a) for a in backlog])
+            if not any(jobs):
+                return
+            for feed, a in interleave(*jobs):
+                if self.stop.is_set() or self.fresh:
+                    break
+                self.in_flight.add(a["url"])
+                yield feed, a
+
+    def next_wakeup(self):
+        # monotonic time of the next poll, retry or stats
+        t = min(self.schedule[0][0], self.next_stats)
+        now, dt_now = monotonic(), datetime.now()
+        for feed in self.feeds:
+            retry = feed._next_retry()
+            if retry:
+                t = min(t, now + (datetime.fromisoformat(retry) - dt_now).total_seconds())
+        return t
+
+    def run(self):
+        if not self.feeds:
+            logging.warning("no feeds, nothing to do")
+            return
+        handlers = {s: signal.signal(s, self._on_signal) for s in (signal.SIGTERM, signal.SIGINT)}
+        logging.info(f"daemon started for {len(self.feeds)} feeds")
+        now = monotonic()
+        # (when, position, feed) - position only breaks ties, feeds do not compare
+        self.schedule = [(now, k, feed) for k, feed in enumerate(self.feeds)]
+        heapq.heapify(self.schedule)
+        self.next_stats = now + self.stats_interval
+        downloader = self.downloader or Downloader(stop=self.stop)
+        try:
+            for feed in self.feeds:
+                feed._open_db()
+            while not self.stop.is_set():
+                self.poll_due()
+                # after a stop the Downloader ends by itself once the running requests are stored
+                for feed, article, r in downloader.run(self.backlog()):
+                    self.in_flight.discard(article["url"])
+                    self.downloads += 1
+                    feed._store_download(article, r, self.downloads, self.downloads + len(self.in_flight))
+                    if not self.stop.is_set():
+                        self.poll_due()
+                        self.stats_due()
+                if self.stop.is_set() and self.in_flight:
+                    logging.warning(f"stopped: {len(self.in_flight)} downloads not sent")
+                self.in_flight.clear()
+                self.stats_due()
+                if not self.stop.is_set():
+                    self.stop.wait(max(0.0, self.next_wakeup() - monotonic()))
+        finally:
+            # commits what has been downloaded so far
+            for feed in self.feeds:
+                if feed.conn:
+                    feed._close_db()
+            for s, handler in handlers.items():
+                signal.signal(s, handler)
+        logging.info("daemon stopped")
+
+
+if __name__ == "__main__":
+    pass
@@ -27,9 +27,15 @@ def text(name):
 def json(name):
     return _thejson.loads(text(name))
 
+_FEEDS = None
+
 # DONE buffering
 def feeds():
-    return json("feeds.json")
+    # parsed once, treat as read-only
+    global _FEEDS
+    if _FEEDS is None:
+        _FEEDS = json("feeds.json")
+    return _FEEDS
 
 _SCHEMA_BUFFER = dict()
 
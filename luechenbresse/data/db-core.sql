@@ -4,8 +4,8 @@
 CREATE TABLE IF NOT EXISTS articles (
     -- from feed or archive
     url TEXT PRIMARY KEY,       -- referenced URL, assuming this is not reused later
-                                -- TODO: make sure that older articles with http 200 will not be overwritten
-                                --          by batch runs, only by manual fixes
+                                -- articles with http 200 are not overwritten by batch runs, only by manual fixes,
+                                --          later versions go to article_revisions (see revisit.py)
     rss_id TEXT,                -- id-field from RSS feed
     title TEXT,                 -- decorative only, can be used for console output
     ts TEXT,                    -- iso timestamp of data
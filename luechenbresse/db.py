@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Connection manager for the feed databases: one tuned, long-lived connection per database file.
+Configuration in luechenbresse.ini (defaults shown):
+[sqlite]
+journal_mode = WAL
+synchronous = NORMAL
+cache_size = -65536     negative: KiB, i.e. 64 MB
+mmap_size = 268435456   bytes
+batch_size = 50         commit after so many changes ...
+batch_seconds = 30      ... or after so many seconds, whatever comes first
+
+Created: 18.10.26
+"""
+
+import atexit
+import sqlite3
+from pathlib import Path
+from time import monotonic
+import logging
+
+from luechenbresse import ini
+from luechenbresse import metrics
+
+_CONNECTIONS = dict()
+
+_PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", "-65536"),
+    ("mmap_size", "268435456"),
+]
+
+
+def tune(conn):
+    for pragma, default in _PRAGMAS:
+        value = ini.get("sqlite", pragma, default)
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+def connect(db_file):
+    key = str(Path(db_file).resolve())
+    if key not in _CONNECTIONS:
+        conn = sqlite3.connect(key)
+        tune(conn)
+        _CONNECTIONS[key] = conn
+        logging.info(f"connected to {key}")
+    return _CONNECTIONS[key]
+
+def close(db_file):
+    key = str(Path(db_file).resolve())
+    conn = _CONNECTIONS.pop(key, None)
+    if conn is not None:
+        try:
+            conn.commit()
+        finally:
+            conn.close()
+
+def close_all():
+    # commits what is pending; runs at exit, too
+    for key in list(_CONNECTIONS):
+        try:
+            close(key)
+        except Exception:
+            logging.exception(f"cannot close {key}")
+
+atexit.register(close_all)
+
+
+class Batch:
+    """
+    Groups commits: tick() after each change, commits after batch_size changes or batch_seconds seconds.
+    Use as context manager to commit the rest even when things go wrong.
+    """
+
+    def __init__(self, conn, size=None, seconds=None):
+        self.conn = conn
+        self.size = int(size or ini.get("sqlite", "batch_size", 50))
+        self.seconds = float(seconds or ini.get("sqlite", "batch_seconds", 30))
+        self.pending = 0
+        self.t0 = monotonic()
+
+    def tick(self, n=1):
+        self.pending += n
+        if self.pending >= self.size or monotonic() - self.t0 >= self.seconds:
+            self.commit()
+
+    def commit(self):
+        if self.pending:
+            with metrics.timer("commit"):
+                self.conn.commit()
+        self.pending = 0
+        self.t0 = monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        # every tick marks a complete change, so those are worth keeping
+        self.commit()
+        return False
+
+
+if __name__ == "__main__":
+    pass
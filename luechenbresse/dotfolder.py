@@ -4,20 +4,32 @@
 """
 Collect code that works with the files in teh .luechenbresse folder directly.
 
+Logging configuration in luechenbresse.ini (defaults shown), levels are DEBUG, INFO, WARNING, ERROR or OFF:
+[logging]
+level = INFO            root logger
+console = DEBUG         stdout
+file = INFO             default.log
+current = DEBUG         current.log, sent via mail (OFF not possible)
+queue = yes             a background thread writes the log, the downloads don't wait for the disk
+
 Created: 15.05.20
 """
 
 import sys
 import os
 from pathlib import Path
-import sqlite3
+import atexit
+import queue
 import logging
 import logging.handlers
 import configparser
 
+from luechenbresse import ini
 from luechenbresse import data
+from luechenbresse import registry
+from luechenbresse import db
+from luechenbresse import migrations
 from luechenbresse import __version__ as luechenbresse_version      # TODO gefällt mir nicht
-from luechenbresse.mailgun import Mailgun
 
 
 def ensure_dotfolder():
@@ -27,14 +39,10 @@ def ensure_dotfolder():
         config_folder.mkdir()
 
 def _create_db(db_file, schema):
-    # TODO support more than one schema per db
-    if isinstance(schema, list):
-        schema = schema[0]
-    sql = data.schema(schema)
-    con = sqlite3.connect(db_file)
-    cur = con.cursor()
-    cur.executescript(sql)
-    con.close()
+    # creating is migrating from version 0
+    con = db.connect(db_file)
+    migrations.migrate(con, schema)
+    db.close(db_file)
 
 def init_dotfolder(db_folder):
 
@@ -78,6 +86,9 @@ def init_dotfolder(db_folder):
     config["databases"]["folder"] = str(db_folder)
     with open(ini_file, "w") as fp:
         config.write(fp)
+    # LogManager has read the ini already, commands after --init need the new folder
+    ini.reload()
+    registry.reset()
 
     if db_folder.exists():
         logging.info("Using existing folder")
@@ -85,23 +96,37 @@ def init_dotfolder(db_folder):
         logging.info(f"Creating {db_folder}...")
         db_folder.mkdir()
 
-    feeds = data.feeds()
+    # packaged feeds and those from luechenbresse.ini
+    feeds = registry.merged(data.feeds(), ini.sections(registry.SECTION_PREFIX))
+    registry.validate(feeds)
     for name in feeds:
         logging.info(f"Installing {name}")
         feed = feeds[name]
         db_file = db_folder / feed["db"]
         schema = feed["schema"]
         if db_file.exists():
-            logging.info(f"Database {db_file} exists. LEAVING UNCHANGED")
+            logging.info(f"Database {db_file} exists, will be migrated if needed")
+            _create_db(db_file, schema)
         else:
             logging.info(f"Database {db_file} will be created with schema {schema}")
             _create_db(db_file, schema)
 
 
+def _level(sink, default):
+    name = ini.get("logging", sink, default).strip().upper()
+    if name == "OFF":
+        return None
+    level = logging.getLevelName(name)
+    if not isinstance(level, int):
+        raise ValueError(f"luechenbresse.ini: unknown log level {name} for {sink}")
+    return level
+
+
 class LogManager(object):
     """
     Set up logging and hold enough context to close the logfile for the current run and send contents via mail
     when all is set and done. A lalzada-Singleton.
+    In queue mode the root logger only puts records into a queue, a QueueListener thread does the writing.
     """
 
     def __new__(cls):
@@ -109,39 +134,102 @@ class LogManager(object):
             FMT = "%(asctime)s [%(levelname)s] %(message)s"
             cls.instance = super().__new__(cls)
             self = cls.instance  # TODO scnr
+            formatter = logging.Formatter(FMT)
+            self.handlers = list()
 
             # default.log with 10 rotating segments of 100k each -> 1 MB (reicht viele Tage)
-            log_file = Path(os.environ["HOME"]) / ".luechenbresse" / "default.log"
-            rfh = logging.handlers.RotatingFileHandler(log_file, maxBytes=100_000, backupCount=10)
-            rfh.setLevel(logging.INFO)
-
-            # console output TODO switch off via ini-file
-            sh = logging.StreamHandler(sys.stdout)
-            sh.setLevel(logging.DEBUG)
+            level = _level("file", "INFO")
+            if level is not None:
+                log_file = Path(os.environ["HOME"]) / ".luechenbresse" / "default.log"
+                rfh = logging.handlers.RotatingFileHandler(log_file, maxBytes=100_000, backupCount=10)
+                rfh.setLevel(level)
+                self.handlers.append(rfh)
+
+            # console output
+            level = _level("console", "DEBUG")
+            if level is not None:
+                sh = logging.StreamHandler(sys.stdout)
+                sh.setLevel(level)
+                self.handlers.append(sh)
 
             # file for output of the current run, will be sent via mail
             self.oneoff_file = Path(os.environ["HOME"]) / ".luechenbresse" / "current.log"
             self.fh = logging.FileHandler(self.oneoff_file, mode="w")
-            self.fh.setLevel(logging.DEBUG)
-
-            logging.basicConfig(level=logging.INFO, handlers=[rfh, sh, self.fh], format=FMT)
+            self.fh.setLevel(_level("current", "DEBUG") or logging.DEBUG)
+            self.handlers.append(self.fh)
+
+            for h in self.handlers:
+                h.setFormatter(formatter)
+
+            root_level = _level("level", "INFO") or logging.CRITICAL + 1
+            self.listener = None
+            if ini.get("logging", "queue", "yes").lower() in ("yes", "true", "on", "1"):
+                self.qh = logging.handlers.QueueHandler(queue.SimpleQueue())
+                # the message only, the sinks add time and level
+                self.qh.setFormatter(logging.Formatter("%(message)s"))
+                self.listener = logging.handlers.QueueListener(self.qh.queue, *self.handlers,
+                                                               respect_handler_level=True)
+                self.listener.start()
+                # before logging.shutdown, which is registered earlier and so runs later
+                atexit.register(self.flush)
+                logging.basicConfig(level=root_level, handlers=[self.qh])
+            else:
+                logging.basicConfig(level=root_level, handlers=self.handlers)
             logging.info("LogManager lebt.")
             logging.info(f"luechenbresse.__version__ = {luechenbresse_version}")  # TODO gefällt mir nicht
 
         return cls.instance
 
+    def flush(self):
+        """
+        Write out everything queued so far and stop the listener thread; from now on logging is synchronous.
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            logger = logging.getLogger()
+            logger.removeHandler(self.qh)
+            for h in self.handlers:
+                logger.addHandler(h)
+
+    def rotate(self, subject):
+        """
+        For long running processes: send the report of current.log so far and start it afresh.
+        """
+        if self.listener is not None:
+            # write out what is queued, the listener thread can be started again
+            self.listener.stop()
+            self.listener.start()
+        from luechenbresse import report
+        self.fh.acquire()
+        try:
+            self.fh.flush()
+            try:
+                report.send(self.oneoff_file, subject)
+            except Exception:
+                logging.exception("cannot send the report")
+            self.fh.stream.seek(0)
+            self.fh.stream.truncate()
+        finally:
+            self.fh.release()
+        logging.info(f"~/.luechenbresse/current.log started afresh")
+
     def mail(self):
         # close current.log
         # https://stackoverflow.com/questions/15435652/python-does-not-release-filehandles-to-logfile
+        self.flush()
         logger = logging.getLogger()
         logger.removeHandler(self.fh)
+        self.fh.close()
+        self.handlers.remove(self.fh)
         logging.info(f"closed ~/.luechenbresse/current.log")
-        # send file contents via email
-        # https://realpython.com/python-pathlib/#reading-and-writing-files
+        # summary and compressed log, delivered in the background
+        from luechenbresse import report
         subject = "von luechenbresse with love"
-        body = self.oneoff_file.read_text()
-        Mailgun().shoot(subject, body)
-
+        try:
+            report.send(self.oneoff_file, subject)
+        except Exception:
+            logging.exception("cannot send the report")
 
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Concurrent download of backlog articles.
+HTTP requests run in a thread pool, politeness is enforced per host by a token bucket.
+Results are handed back to the calling thread, so all database work stays there.
+
+Created: 18.10.26
+"""
+
+import threading
+from time import monotonic, sleep
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import logging
+
+from luechenbresse import ini
+
+
+class TokenBucket:
+    """
+    Classic token bucket: <rate> tokens per second, at most <capacity> tokens saved up.
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, stop=None):
+        # returns False when the event stop is set while waiting
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return True
+                wait_for = (1.0 - self.tokens) / self.rate
+            if stop is None:
+                sleep(wait_for)
+            elif stop.wait(wait_for):
+                return False
+
+
+class Downloader:
+    """
+    Runs jobs (owner, article) through a thread pool.
+    Each host gets its own TokenBucket, the pool size is the global concurrency cap.
+    Configuration in luechenbresse.ini:
+    [download]
+    concurrency = 4         global cap of parallel requests
+    rate = 0.2              requests per second and host (0.2 ~ one request every 5 s)
+    burst = 1               requests a host may get in a row after a pause
+    Setting the event stop ends run() cleanly: no new requests are sent, the running ones are still handed back.
+    """
+
+    def __init__(self, concurrency=None, rate=None, burst=None, stage="download", stop=None):
+        self.concurrency = int(concurrency or ini.get("download", "concurrency", 4))
+        self.rate = float(rate or ini.get("download", "rate", 0.2))
+        self.burst = float(burst or ini.get("download", "burst", 1))
+        self.stage = stage      # for the metrics
+        self.stop = stop if stop is not None else threading.Event()
+        self.buckets = dict()
+        self.lock = threading.Lock()
+        logging.info(f"Downloader: concurrency={self.concurrency}, rate={self.rate}/s per host, burst={self.burst}")
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def fetch(self, url, headers=None):
+        # runs in a worker thread, None when stopped before the request was sent
+        from luechenbresse.feed import get
+        if self.stop.is_set() or not self.bucket(url).acquire(self.stop):
+            return None
+        return get(url, headers=headers, stage=self.stage)
+
+    def run(self, jobs):
+        """
+        jobs: iterable of (owner, article), article like returned by Feed._get_backlog(), maybe with "headers"
+        yields (owner, article, response) in order of completion
+        Never more than 2 * concurrency jobs are pending, so long backlogs are not submitted at once.
+        After stop is set no more jobs are taken, the pending ones are drained: what was sent is yielded,
+        the others are dropped.
+        """
+        jobs = iter(jobs)
+        pending = dict()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            while True:
+                while len(pending) < 2 * self.concurrency and not self.stop.is_set():
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    owner, article = job
+                    pending[executor.submit(self.fetch, article["url"], article.get("headers"))] = job
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    owner, article = pending.pop(future)
+                    r = future.result()
+                    if r is not None:
+                        yield owner, article, r
+        finally:
+            # KeyboardInterrupt or consumer stopped early: drop what has not started yet
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+
+def interleave(*lists):
+    # round robin over several lists, so that no host starves the pool
+    iters = [iter(l) for l in lists]
+    while iters:
+        alive = list()
+        for it in iters:
+            x = next(it, None)
+            if x is not None:
+                yield x
+                alive.append(it)
+        iters = alive
+
+
+if __name__ == "__main__":
+    pass
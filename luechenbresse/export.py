@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Streaming export of articles and parsed data to Parquet or Arrow IPC files for analysis in notebooks.
+Rows are read in chunks in order of ts and written to one file per partition:
+    DIR/feed=<name>/calweek=<calweek>/part-0.parquet (or .arrow)
+Articles without ts go to calweek=unknown, unless a date range is given.
+The html column is only exported when asked for explicitly.
+Files of partitions exported again are overwritten.
+Needs pyarrow (pip install luechenbresse[export]).
+
+Created: 18.10.26
+"""
+
+from pathlib import Path
+from itertools import groupby
+from time import perf_counter
+import logging
+
+from luechenbresse import ini
+from luechenbresse import registry
+from luechenbresse import extract
+
+# column -> (table alias, arrow type name)
+COLUMNS = {
+    "url": ("a", "string"),
+    "rss_id": ("a", "string"),
+    "title": ("a", "string"),
+    "ts": ("a", "string"),
+    "realised_ts": ("a", "string"),
+    "dl_ts": ("a", "string"),
+    "dl_http": ("a", "int64"),
+    "dl_dt": ("a", "float64"),
+    "html": ("a", "string"),
+    "text_json": ("p", "string"),
+    "meta_json": ("p", "string"),
+    "plain": ("p", "string"),
+    "calweek": ("p", "string"),
+    "dow": ("p", "string"),
+    "parser": ("p", "int64"),
+}
+
+DEFAULT_COLUMNS = ["url", "ts", "title", "dl_http", "calweek", "dow", "plain"]
+
+CHUNK_SQL = """
+    SELECT a.rowid, a.ts, a.html_ref, {columns}
+    FROM articles a LEFT JOIN parsed p ON p.url = a.url
+    WHERE ( a.ts, a.rowid ) > ( ?, ? ) AND a.ts < ?
+    ORDER BY a.ts, a.rowid
+    LIMIT ?
+"""
+# row values never compare with NULL, so articles without ts need a pass of their own
+UNDATED_SQL = """
+    SELECT a.rowid, a.ts, a.html_ref, {columns}
+    FROM articles a LEFT JOIN parsed p ON p.url = a.url
+    WHERE a.ts IS NULL AND a.rowid > ?
+    ORDER BY a.rowid
+    LIMIT ?
+"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("--export needs pyarrow, try: pip install luechenbresse[export]")
+
+
+class PartitionWriter:
+    """
+    One open file at a time, as rows arrive ordered by ts, and so by calweek.
+    """
+
+    def __init__(self, pa, folder, schema, fmt):
+        self.pa = pa
+        self.folder = folder
+        self.schema = schema
+        self.fmt = fmt
+        self.calweek = None
+        self.writer = None
+        self.files = 0
+
+    def write(self, calweek, columns):
+        if calweek != self.calweek:
+            self.close()
+            path = self.folder / f"calweek={calweek}"
+            path.mkdir(parents=True, exist_ok=True)
+            if self.fmt == "arrow":
+                self.writer = self.pa.ipc.new_file(str(path / "part-0.arrow"), self.schema)
+            else:
+                self.writer = self.pa.parquet.ParquetWriter(str(path / "part-0.parquet"), self.schema)
+            self.calweek = calweek
+            self.files += 1
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def export_feed(feed, folder, columns=None, date_from=None, date_to=None, fmt="parquet", with_html=False,
+                chunk_size=None):
+    """
+    Export one (unopened) Feed to folder/feed=<name>/..., returns the number of rows exported.
+    date_from, date_to: iso dates or timestamps, date_to exclusive; articles without ts only without both
+    """
+    pa = _pyarrow()
+    chunk_size = int(chunk_size or ini.get("export", "chunk_size", 5000))
+    columns = list(columns or DEFAULT_COLUMNS)
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown columns: {', '.join(unknown)}")
+    if "html" in columns and not with_html:
+        columns.remove("html")
+    if with_html and "html" not in columns:
+        columns.append("html")
+    schema = pa.schema([(c, getattr(pa, COLUMNS[c][1])()) for c in columns])
+    select = ", ".join(f"{COLUMNS[c][0]}.{c}" for c in columns)
+    i_html = columns.index("html") if "html" in columns else None
+    i_calweek = columns.index("calweek") if "calweek" in columns else None
+
+    writer = PartitionWriter(pa, Path(folder) / f"feed={feed.name}", schema, fmt)
+    feed._open_db()
+    cnt = 0
+    pc0 = perf_counter()
+
+    def write(rows):
+        records = list()
+        for row in rows:
+            record = list(row[3:])
+            if i_html is not None and row[2] is not None:
+                record[i_html] = feed.html_store.get(row[2])
+            records.append((extract.calweek(row[1]) if row[1] else "unknown", record))
+        if i_calweek is not None:
+            for calweek, record in records:
+                record[i_calweek] = record[i_calweek] or calweek
+        for calweek, group in groupby(records, key=lambda x: x[0]):
+            group = [record for _, record in group]
+            writer.write(calweek, {c: [r[i] for r in group] for i, c in enumerate(columns)})
+
+    try:
+        # ( date_from, -1 ) < ( ts, rowid ) includes date_from itself
+        last_ts, last_rowid = (date_from or ""), -1
+        sql = CHUNK_SQL.format(columns=select)
+        while True:
+            rows = feed.conn.execute(sql, (last_ts, last_rowid, date_to or "9999", chunk_size)).fetchall()
+            if not rows:
+                break
+            last_rowid, last_ts = rows[-1][0], rows[-1][1]
+            write(rows)
+            cnt += len(rows)
+            logging.info(f"{feed.name}: exported {cnt} rows up to {last_ts}")
+        if date_from is None and date_to is None:
+            last_rowid, undated = -1, 0
+            sql = UNDATED_SQL.format(columns=select)
+            while True:
+                rows = feed.conn.execute(sql, (last_rowid, chunk_size)).fetchall()
+                if not rows:
+                    break
+                last_rowid = rows[-1][0]
+                write(rows)
+                undated += len(rows)
+            if undated:
+                cnt += undated
+                logging.info(f"{feed.name}: exported {undated} rows without ts to calweek=unknown")
+    finally:
+        writer.close()
+        feed._close_db()
+    logging.info(f"{feed.name}: {cnt} rows in {writer.files} files in {perf_counter() - pc0:0.1f}s")
+    return cnt
+
+def export_all_feeds(folder, **kwargs):
+    for feed in registry.registry().feeds():
+        export_feed(feed, folder, **kwargs)
+
+
+if __name__ == "__main__":
+    pass
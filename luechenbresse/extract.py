@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Helpers for the feed specific HTML extractors (parse_article in the feed modules).
+
+Created: 18.10.26
+"""
+
+from datetime import datetime
+from urllib.parse import urljoin, urldefrag
+
+_DOW = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
+
+
+def soup(html):
+    # bs4 is only needed when parsing, so it is not imported before
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "html.parser")
+
+def meta(doc, *names):
+    # content of the first <meta property=...> or <meta name=...> found
+    for name in names:
+        tag = doc.find("meta", attrs={"property": name}) or doc.find("meta", attrs={"name": name})
+        if tag and tag.get("content"):
+            return tag["content"].strip()
+    return None
+
+def texts(doc, selectors):
+    # texts of the nodes matched by the first selector that matches at all
+    for selector in selectors:
+        nodes = doc.select(selector)
+        if nodes:
+            return [t for t in (node.get_text(" ", strip=True) for node in nodes) if t]
+    return []
+
+def links(doc, selectors, base_url):
+    # (absolute URL, text) of the <a href> nodes matched by the first selector that matches at all
+    for selector in selectors:
+        nodes = [node for node in doc.select(selector) if node.get("href")]
+        if nodes:
+            return [(urldefrag(urljoin(base_url, node["href"]))[0], node.get_text(" ", strip=True)) for node in nodes]
+    return []
+
+def first_text(doc, selectors):
+    l = texts(doc, selectors)
+    return l[0] if l else None
+
+def calweek(ts):
+    # iso timestamp -> like 2020.05
+    iso = datetime.fromisoformat(ts[:19]).isocalendar()
+    return f"{iso[0]}.{iso[1]:02d}"
+
+def dow(ts):
+    # iso timestamp -> like 'Mo'
+    return _DOW[datetime.fromisoformat(ts[:19]).weekday()]
+
+
+if __name__ == "__main__":
+    pass
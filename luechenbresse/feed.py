@@ -8,66 +8,72 @@ Created: 09.05.20
 """
 
 import json
-from time import time, mktime, sleep, perf_counter
+from time import time, mktime, perf_counter
 from datetime import datetime, timedelta
-import random
-import sqlite3
 from pathlib import Path
-import importlib
+from urllib.parse import urlsplit
 import logging
 
-import requests
-import feedparser
-
 from luechenbresse import ini
-from luechenbresse import data
+from luechenbresse import registry
+from luechenbresse import retry
+from luechenbresse import feedstream
+from luechenbresse import session
+from luechenbresse import db
+from luechenbresse import migrations
+from luechenbresse import metrics
+from luechenbresse.blobstore import HtmlStore
+from luechenbresse.download import Downloader, interleave
 
 
 # mimicks a very simple Request object when a request failed
 class FakeResponse:
-    def __init__(self, dpc):
+    def __init__(self, dpc, error=None):
         self.status_code = 999
+        self.error = error      # class name of the exception, for the retry state
         self.text = None
+        self.content = None
+        self.headers = dict()
         self.response_time = timedelta(seconds=dpc)
         self.elapsed = self.response_time
 
-# https://stackoverflow.com/questions/42365096/sensible-way-to-extend-requests-response-class
-class XResponse(requests.Response):
-    def __init__(self, req_response, response_time):
-        for k, v in req_response.__dict__.items():
-            self.__dict__[k] = v
-        self.response_time = response_time
-
-# tame network requests
-def hold_on():
-    bubu = random.uniform(3, 8)
-    logging.info(f"sleeping {bubu:0.2f} sec")
-    sleep(bubu)
-
-def get(url):
+def get(url, headers=None, stage="download"):
     pc0 = perf_counter()
     try:
-        r = requests.get(url)
+        r = session.session().get(url, headers=headers, timeout=session.timeout())
     except Exception as ex:
         logging.exception(f"Exception during HTTP GET {url}")
-        r = FakeResponse(perf_counter() - pc0)
-    dpc = perf_counter() - pc0
-    r = XResponse(r, dpc)
+        r = FakeResponse(perf_counter() - pc0, ex.__class__.__name__)
+    r.response_time = perf_counter() - pc0
+    metrics.record(stage, r.response_time, urlsplit(url).netloc)
     logging.info(f'HTTP {r.status_code}: {url} [{r.response_time * 1000:0.0f} ms]')
     return r
 
 
+# due downloads, the WHERE clause must match the partial index articles_backlog of migration 9 exactly
+BACKLOG_SQL = """
+    SELECT url, ts, title, dl_attempts FROM articles
+    WHERE ( dl_http != 200 OR dl_http IS NULL ) AND url != '' AND dl_parked IS NULL
+        AND ( dl_next_ts IS NULL OR dl_next_ts <= ? )
+    ORDER BY ts
+"""
+# when the next failed download is due again
+NEXT_RETRY_SQL = """
+    SELECT min(dl_next_ts) FROM articles
+    WHERE ( dl_http != 200 OR dl_http IS NULL ) AND url != '' AND dl_parked IS NULL AND dl_next_ts > ?
+"""
+
+
 class Feed:
 
     @staticmethod
     def from_json(name, feed):
-        return Feed(name, feed["feed"], feed["type"], feed["db"], feed["type"])
+        return Feed(name, feed["feed"], feed["type"], feed["db"], feed["schema"])
 
     @staticmethod
     def from_name(name):
-        feed_list = data.feeds()
-        feed = feed_list[name]
-        return Feed.from_json(name, feed)
+        # one instance per feed and process
+        return registry.registry().feed(name)
 
     @staticmethod
     def process_feed(name):
@@ -78,130 +84,229 @@ class Feed:
     @staticmethod
     def process_all_feeds():
         logging.debug("process_all_feeds()")
-        feeds = data.feeds()
-        logging.debug(f"{len(feeds)} feeds")
-        for name in feeds:
-            feed = Feed.from_name(name)
+        all_feeds = registry.registry().feeds()
+        logging.debug(f"{len(all_feeds)} feeds")
+        for feed in all_feeds:
             feed.get_rss()
-        for name in feeds:
-            try:
-                feed = Feed.from_name(name)
-                feed.process_backlog()
-            except KeyboardInterrupt:
-                logging.warning(f"KeyboardInterrupt: skipping rest if {name}")
+        # one pool for all feeds, so that different hosts download in parallel
+        Feed.process_backlogs(all_feeds)
 
-    def __init__(self, name, feed, type, db, schema):
+    @staticmethod
+    def process_backlogs(feeds):
+        jobs = list()
+        try:
+            for feed in feeds:
+                feed._open_db()
+                logging.info(f"Processing backlog for {feed.name}")
+                jobs.append([(feed, a) for a in feed._get_backlog()])
+            n = sum(len(j) for j in jobs)
+            for i, (feed, article, r) in enumerate(Downloader().run(interleave(*jobs))):
+                feed._store_download(article, r, i+1, n)
+        except KeyboardInterrupt:
+            logging.warning("KeyboardInterrupt: skipping rest of the backlog")
+        finally:
+            # commits what has been downloaded so far
+            for feed in feeds:
+                if feed.conn:
+                    feed._close_db()
+
+    def __init__(self, name, feed, type, db, schema, adapter=None):
         """
-        Constructor.
+        Constructor, better use Feed.from_name().
         :param feed: url of the feed
         :param type: rss|...
-        :param db: name of the db file (location from luechenbresse.ini)
+        :param db: name of the db file (location from luechenbresse.ini) or its absolute path
         :param schema: list(str) of schemas to apply
+        :param adapter: FeedAdapter with the feed specific parsing, from luechenbresse.<name> if not given
         """
         logging.info(f"Feed.__init__: {name} ({type}) from {feed}")
         self.name = name
         self.feed = feed
         self.type = type
-        ini_path = ini.get("databases", "folder")
-        if not ini_path:
-            raise ValueError(f"No database folder specified in luechenbresse.ini")
-        ini_file = Path(ini_path)
-        self.db = ini_file / db
+        if Path(db).is_absolute():
+            self.db = Path(db)
+        else:
+            ini_path = ini.get("databases", "folder")
+            if not ini_path:
+                raise ValueError(f"No database folder specified in luechenbresse.ini")
+            self.db = Path(ini_path) / db
         self.schema = schema # TODO support more than one schema
-        feed_module_name = "luechenbresse."+name
-        logging.info(f"loading module {feed_module_name}")
-        self.feed_module = importlib.import_module(feed_module_name)
+        self.adapter = adapter or registry.load_adapter(name)
+        self.retry_policy = retry.Policy()
         # methods will open and close connection if not done from outside
         self.conn = None
         self.cur = None
+        self.html_store = None
+        self.batch = None
 
     def _open_db(self):
-        self.conn = sqlite3.connect(self.db)
+        # the connection itself is kept open by the connection manager
+        self.conn = db.connect(self.db)
+        migrations.migrate(self.conn, self.schema)
         self.cur = self.conn.cursor()
+        self.html_store = HtmlStore(self.conn)
+        self.batch = db.Batch(self.conn)
 
     def _close_db(self):
-        self.conn.close()
+        self.batch.commit()
         self.conn = None
         self.cur = None
+        self.html_store = None
+        self.batch = None
 
     def _is_there(self, url):
         sql = """
-            SELECT * 
+            SELECT 1 
             FROM articles 
             WHERE url = ?
         """
-        rows = [r for r in self.cur.execute(sql, (url,))]
-        return len(rows) == 1
-
-    def _upsert_article(self, url, rss_id, title, ts):
+        return self.cur.execute(sql, (url,)).fetchone() is not None
+
+    def _known_urls(self, urls, checked=None):
+        # one query per 500 URLs (stays below SQLITE_MAX_VARIABLE_NUMBER of older SQLite builds)
+        # checked: dict url -> known of earlier calls, those URLs are not queried again
+        urls = list(urls)
+        todo = urls if checked is None else [url for url in urls if url not in checked]
+        known = set()
+        for k in range(0, len(todo), 500):
+            chunk = todo[k:k+500]
+            sql = f"SELECT url FROM articles WHERE url IN ({', '.join('?' * len(chunk))})"
+            known.update(row[0] for row in self.cur.execute(sql, chunk))
+        if checked is None:
+            return known
+        checked.update((url, url in known) for url in todo)
+        return {url for url in urls if checked[url]}
+
+    def _upsert_articles(self, entries, realised=True):
+        # entries: list of (url, rss_id, title, ts)
+        # realised=False: not seen in the feed (archive), keeps realised_ts NULL for the daemon's poll interval
         sql = """
             INSERT INTO articles(url, rss_id, title, ts, realised_ts) 
                 VALUES (?, ?, ?, ?, ?)
                 ON CONFLICT DO NOTHING
         """
+        now = datetime.now().isoformat()[:19] if realised else None
+        self.cur.executemany(sql, [(url, rss_id, title, ts, now) for url, rss_id, title, ts in entries])
+        return self.cur.rowcount
+
+    def _parse_feed(self, r, checked=None):
+        """
+        -> (header, entries) like feedparser's feed and entries, but maybe only the entries up to the known ones
+        Streaming parser first, feedparser for what it cannot handle.
+        checked: dict, gets the URLs looked up for stopping early, see _known_urls()
+        """
+        if ini.get("feed", "parser", "stream") == "stream":
+            try:
+                stop_after_known = int(ini.get("feed", "stop_after_known", 5))
+                known_urls = lambda urls: self._known_urls(urls, checked)
+                header, entries, stopped = feedstream.parse(r.content, known_urls, stop_after_known)
+                if stopped:
+                    logging.info(f"stopped after {len(entries)} entries, {stop_after_known} known in a row")
+                return header, entries
+            except (feedstream.Unsupported, feedstream.ParseError) as ex:
+                logging.info(f"falling back to feedparser: {ex}")
+        import feedparser   # heavy, only needed here
+        f = feedparser.parse(r.content, response_headers=r.headers)
+        if f.get("bozo") and not f["entries"]:
+            # broken feed, its ETag must not be kept
+            raise ValueError(f"feedparser: {f.get('bozo_exception')}")
+        return f["feed"], f["entries"]
+
+    def _cleansed_entries(self, raw_entries):
+        # -> list of adapter.Entry, duplicates removed (the last one wins), newest first
+        entries = self.adapter.normalize(raw_entries)
+        for entry in entries:
+            if not entry.url:
+                logging.info(f"empty URL for '{entry.title}' dated '{entry.ts}'")
+        unique = {entry.url: entry for entry in entries if entry.url}
+        result = sorted(unique.values(), key=lambda entry: entry.ts or "", reverse=True)
+        logging.info(f"{len(entries)} entries, {len(entries) - sum(1 for e in entries if e.url)} w/o URL, "
+                     f"duplicates removed, remaining: {len(result)} ")
+        return result
+
+    def _get_validators(self):
+        # ETag and Last-Modified of the last successful GET of the feed
+        self.cur.execute("SELECT etag, last_modified FROM feed_http WHERE feed = ?", (self.name,))
+        row = self.cur.fetchone()
+        return row if row else (None, None)
+
+    def _set_validators(self, r):
         now = datetime.now().isoformat()[:19]
-        row_tbi = (url, rss_id, title, ts, now)
-        self.cur.execute(sql, row_tbi)
-
-    def _cleansed_entries(self, fp_feed):
-        # remove duplicates
-        unique = dict()
-        cnt = 0
-        cnt_no_url = 0
-        for raw_entry in fp_feed["entries"]:
-            cnt += 1
-            entry = self.feed_module.parse_feed_entry(raw_entry)
-            if entry[0]: # entry[0]=url         # TODO use named tuple
-                unique[entry[0]] = entry
-            else:
-                cnt_no_url += 1
-                logging.info(f"empty URL for '{entry[2]}' dated '{entry[3]}'") # 2=title, 3=ts
-        # sort by time
-        # TODO list comprehension
-        entries = list()
-        for url in unique:
-            entries.append(unique[url])
-        entries.sort(key=lambda tup: tup[3], reverse=True)  # tup[3]=ts
-        logging.info(f"{cnt} entries, {cnt_no_url} w/o URL, duplicates removed, remaining: {len(entries)} ")
-        return entries
+        self.cur.execute("""
+            INSERT INTO feed_http(feed, etag, last_modified, checked_ts) VALUES (?, ?, ?, ?)
+                ON CONFLICT(feed) DO UPDATE SET 
+                    etag = excluded.etag, last_modified = excluded.last_modified, checked_ts = excluded.checked_ts
+        """, (self.name, r.headers.get("ETag"), r.headers.get("Last-Modified"), now))
 
     def get_rss(self):
+        """
+        Get the feed and insert new articles.
+        Returns a dict with the counts of new and known entries and the seconds spent per stage.
+        """
         logging.info(f"GET {self.name}")
         t0 = time()
-        # TODO catch exceptions
+        private_connection = False
+        if not self.cur:
+            private_connection = True
+            self._open_db()
+        try:
+            stats = self._get_rss()
+        finally:
+            if private_connection:
+                self._close_db()
+        stats["total"] = time() - t0
+        logging.info(f"get_rss() total: {stats['total']:0.3f}s")
+        return stats
+
+    def _get_rss(self):
+        stats = {"new": 0, "known": 0}
+        t0 = time()
+        etag, last_modified = self._get_validators()
+        r = get(self.feed, headers=session.conditional_headers(etag, last_modified), stage="feed fetch")
+        stats["fetch"] = time() - t0
+        if r.status_code == 304:
+            logging.info(f"{self.name} not modified since last run")
+            return stats
+        if r.status_code != 200:
+            logging.warning(f"cannot GET {self.name}, skipping")
+            return stats
+        t0 = time()
+        checked = dict()
         try:
-            f = feedparser.parse(self.feed)
+            header, raw_entries = self._parse_feed(r, checked)
         except Exception:
-            logging.exception(f"cannot GET {self.name}")
+            logging.exception(f"cannot parse {self.name}")
             logging.info(f"skipping {self.name}")
-            return
-        #dt = f"{time() - t0:0.3f}s"
-        title, published = self.feed_module.parse_feed_header(f["feed"])
+            return stats
+        title, published = self.adapter.parse_feed_header(header)
         logging.info(f"feed: {title}")
         if published:
             logging.info(f"published: {published}")
-        logging.info(f"got from the internet in {time() - t0:0.3f} sec")
-        private_connection = False
-        if not self.cur:
-            private_connection = True
-            self._open_db()
         # sort entries by their own timestamps
-        entries = self._cleansed_entries(f)
-        cnt_new = 0
-        cnt_old = 0
-        for entry in entries:
-            url, rss_id, title, ts = entry
-            if self._is_there(url):
-                cnt_old += 1
-            else:
-                cnt_new += 1
-                logging.info(f"{ts} {title}")
-                self._upsert_article(url, rss_id, title, ts)
-        logging.info(f"{cnt_new} new, {cnt_old} known")
-        self.conn.commit()
-        if private_connection:
-            self._close_db()
-        logging.info(f"get_rss() total: {time() - t0:0.3f}s")
+        entries = self._cleansed_entries(raw_entries)
+        stats["parse"] = time() - t0
+        t0 = time()
+        # only what the streaming parser has not looked up already
+        known = self._known_urls((entry.url for entry in entries), checked)
+        new_entries = [entry for entry in entries if entry.url not in known]
+        stats["dedup"] = time() - t0
+        for url, rss_id, title, ts in new_entries:
+            logging.info(f"{ts} {title}")
+        t0 = time()
+        with self.conn:
+            self._upsert_articles(new_entries)
+            self._set_validators(r)
+        stats["insert"] = time() - t0
+        for stage, key in (("feed parse", "parse"), ("dedup", "dedup"), ("db write", "insert")):
+            metrics.record(stage, stats[key], self.name)
+        stats["new"] = len(new_entries)
+        stats["known"] = len(entries) - len(new_entries)
+        metrics.count(self.name, "new", stats["new"])
+        metrics.count(self.name, "known", stats["known"])
+        logging.info(f"{stats['new']} new, {stats['known']} known "
+                     f"[fetch {stats['fetch']:0.3f}s, parse {stats['parse']:0.3f}s, "
+                     f"dedup {stats['dedup']:0.3f}s, insert {stats['insert']:0.3f}s]")
+        return stats
 
     def _get_backlog(self):
         private_connection = False
@@ -209,11 +314,8 @@ class Feed:
             private_connection = True
             self._open_db()
         # avoid code for removal of the empty URL in the database, can still be done mmanually
-        self.cur.execute("""
-            SELECT url, ts, title FROM articles
-            WHERE ( dl_http != 200 OR dl_http IS NULL ) AND url != ''
-            ORDER BY ts
-        """)
+        now = datetime.now().isoformat()[:19]
+        self.cur.execute(BACKLOG_SQL, (now,))
         rows = self.cur.fetchall()
         if private_connection:
             self._close_db()
@@ -222,38 +324,57 @@ class Feed:
             a.append({
                 "url": row[0],
                 "ts": row[1],
-                "title": row[2]
+                "title": row[2],
+                "attempts": row[3] or 0
             })
         logging.info(f"Backlog: {len(a)} Artikel")
         return a
 
-    def _download_article(self, a, i, n):
-        # a like returned by get_backlog()
-        logging.info(f'{i}/{n}: downloading {a["ts"]} –– {a["title"]}')
-        r = get(a["url"])
+    def _next_retry(self):
+        # iso timestamp of the next retry due after now, None if there is none; needs an opened db
+        now = datetime.now().isoformat()[:19]
+        return self.cur.execute(NEXT_RETRY_SQL, (now,)).fetchone()[0]
+
+    def _store_download(self, a, r, i, n):
+        # a like returned by get_backlog(), r like returned by get()
+        logging.info(f'{i}/{n}: downloaded {a["ts"]} –– {a["title"]}')
         now = datetime.now().isoformat()[:19]
-        row = (now, r.status_code, r.response_time, r.text, a["url"])
         private_connection = False
         if not self.cur:
             private_connection = True
             self._open_db()
-        self.cur.execute("""
-            UPDATE articles
-            SET dl_ts = ?, dl_http = ?, dl_dt = ?, html = ?
-            WHERE url = ?
-        """, row)
-        self.conn.commit()
+        html, html_ref = r.text, None
+        if self.html_store.enabled:
+            html, html_ref = None, self.html_store.put(r.text)
+        attempts = a.get("attempts", 0) + 1
+        error, next_ts, parked = retry.error_class(r), None, None
+        if error:
+            next_dt, parked = retry.next_attempt(r.status_code, attempts, datetime.now(), self.retry_policy)
+            next_ts = next_dt.isoformat()[:19] if next_dt else None
+            parked = 1 if parked else None
+            logging.info(f"{error} after {attempts} attempt(s): " + ("parked" if parked else f"next try {next_ts}"))
+        row = (now, r.status_code, r.response_time, html, html_ref, attempts, error, next_ts, parked, a["url"])
+        with metrics.timer("db write", self.name):
+            self.cur.execute("""
+                UPDATE articles
+                SET dl_ts = ?, dl_http = ?, dl_dt = ?, html = ?, html_ref = ?,
+                    dl_attempts = ?, dl_error = ?, dl_next_ts = ?, dl_parked = ?
+                WHERE url = ? AND ( dl_http != 200 OR dl_http IS NULL )
+            """, row)
+        self.batch.tick()
+        metrics.count(self.name, f"HTTP {r.status_code}")
         if private_connection:
             self._close_db()
 
+    def get_html(self, url):
+        # raw HTML of an article, wherever it is stored
+        row = self.cur.execute("SELECT html, html_ref FROM articles WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return self.html_store.resolve(*row)
+
     def process_backlog(self):
-        # TODO vielleicht doch einmal connectiion? Dann aber mit try!
-        logging.info(f"Processing backlog for {self.name}")
-        backlog = self._get_backlog()
-        n = len(backlog)
-        for i, article in enumerate(backlog):
-            self._download_article(article, i+1, n)
-            hold_on()
+        Feed.process_backlogs([self])
 
 
 class FeedAPI:
@@ -263,8 +384,8 @@ class FeedAPI:
     """
 
     INSERT_SQL = """
-        INSERT INTO articles(url, rss_id, title, ts, realised_ts, dl_ts, dl_http, dl_dt, html) 
-            VALUES (:url, :rss_id, :title, :ts, :realised_ts, :dl_ts, :dl_http, :dl_dt, :html)
+        INSERT INTO articles(url, rss_id, title, ts, realised_ts, dl_ts, dl_http, dl_dt, html, html_ref) 
+            VALUES (:url, :rss_id, :title, :ts, :realised_ts, :dl_ts, :dl_http, :dl_dt, :html, :html_ref)
             ON CONFLICT DO NOTHING
     """
 
@@ -296,6 +417,7 @@ class FeedAPI:
         if not d["realised_ts"]:
             now = datetime.now().isoformat()[:19]
             d["realised_ts"] = now
+        self.feed.html_store.split(d)
         self.feed.cur.execute(FeedAPI.INSERT_SQL, d)
         return self.feed.cur.rowcount
 
@@ -306,14 +428,45 @@ class FeedAPI:
             if not d["realised_ts"]:
                 d["realised_ts"] = now
         pc = perf_counter()
+        for d in l:
+            self.feed.html_store.split(d)
         self.feed.cur.executemany(FeedAPI.INSERT_SQL, l)
         rowcount = self.feed.cur.rowcount
         logging.info(f"FeedAPI.insertmany({len(l)}) for {self.name} inserted {rowcount} rows in {(perf_counter() - pc) * 1000.0:0.1f} ms")
         return rowcount
 
+    def insertrows(self, names, rows):
+        # rows: tuples with columns <names> as read from a cursor, comprising all columns used below
+        columns = ("url", "rss_id", "title", "ts", "realised_ts", "dl_ts", "dl_http", "dl_dt", "html")
+        idx = [names.index(c) for c in columns]
+        i_realised, i_html = columns.index("realised_ts"), columns.index("html")
+        now = datetime.now().isoformat()[:19]
+        pc = perf_counter()
+        tuples = list()
+        for row in rows:
+            t = [row[i] for i in idx]
+            if not t[i_realised]:
+                t[i_realised] = now
+            html_ref = None
+            if self.feed.html_store.enabled:
+                html_ref = self.feed.html_store.put(t[i_html])
+                t[i_html] = None
+            tuples.append(t + [html_ref])
+        self.feed.cur.executemany("""
+            INSERT INTO articles(url, rss_id, title, ts, realised_ts, dl_ts, dl_http, dl_dt, html, html_ref) 
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT DO NOTHING
+        """, tuples)
+        rowcount = self.feed.cur.rowcount
+        logging.info(f"FeedAPI.insertrows({len(rows)}) for {self.name} inserted {rowcount} rows in {(perf_counter() - pc) * 1000.0:0.1f} ms")
+        return rowcount
+
     def exists(self, url):
         return self.feed._is_there(url)
 
+    def html(self, url):
+        return self.feed.get_html(url)
+
 
 
 if __name__ == "__main__":
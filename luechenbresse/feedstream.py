@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Streaming parser for RSS 2.0 and Atom feeds, instead of building the complete feedparser result.
+Only what the feed adapters use is kept: feed title, published and updated; per entry link, id, title,
+published, updated and their *_parsed (UTC struct_time), with the same keys as in feedparser. Items are dropped from the tree as soon
+as they are read, and parsing stops after stop_after_known consecutive entries whose URL is known already.
+Anything else (RSS 1.0/RDF, broken XML) raises Unsupported or ParseError, Feed then falls back to feedparser.
+Configuration in luechenbresse.ini (defaults shown):
+[feed]
+parser = stream             feedparser: always use feedparser
+stop_after_known = 5        0: read all entries
+
+Created: 18.10.26
+"""
+
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import xml.etree.ElementTree as ET
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+DC = "{http://purl.org/dc/elements/1.1/}"
+
+ParseError = ET.ParseError
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _utc(dt):
+    # aware or naive (taken as UTC) datetime -> UTC struct_time with tm_isdst = 0, like feedparser
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return time.struct_time(tuple(dt.timetuple())[:8] + (0,))
+
+def rfc822(s):
+    try:
+        return _utc(parsedate_to_datetime(s.strip()))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def iso8601(s):
+    s = s.strip()
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    try:
+        return _utc(datetime.fromisoformat(s))
+    except ValueError:
+        return None
+
+def _text(elem, tag):
+    child = elem.find(tag)
+    if child is None or child.text is None:
+        return None
+    return child.text.strip()
+
+def _rss_item(elem):
+    published = _text(elem, "pubDate")
+    updated = _text(elem, DC + "date")
+    return {
+        "link": _text(elem, "link"),
+        "id": _text(elem, "guid"),
+        "title": _text(elem, "title"),
+        "published": published,
+        "published_parsed": rfc822(published) if published else None,
+        "updated": updated,
+        "updated_parsed": iso8601(updated) if updated else None,
+    }
+
+def _atom_entry(elem):
+    link = None
+    for node in elem.findall(ATOM + "link"):
+        if node.get("rel", "alternate") == "alternate":
+            link = node.get("href")
+            break
+    published = _text(elem, ATOM + "published")
+    updated = _text(elem, ATOM + "updated")
+    return {
+        "link": link,
+        "id": _text(elem, ATOM + "id"),
+        "title": _text(elem, ATOM + "title"),
+        "published": published,
+        "published_parsed": iso8601(published) if published else None,
+        "updated": updated,
+        "updated_parsed": iso8601(updated) if updated else None,
+    }
+
+# header fields: (path of tags from the root, tag) -> key like in feedparser
+_HEADER = {
+    (("rss", "channel"), "title"): "title",
+    (("rss", "channel"), "pubDate"): "published",
+    (("rss", "channel"), "lastBuildDate"): "updated",
+    ((ATOM + "feed",), ATOM + "title"): "title",
+    ((ATOM + "feed",), ATOM + "updated"): "updated",
+}
+_ENTRY = {"item": _rss_item, ATOM + "entry": _atom_entry}
+
+
+def parse(content, known_urls=None, stop_after_known=0, chunk_size=65536):
+    """
+    content: the feed as bytes
+    known_urls: list of URLs -> set of the known ones, for stopping early; called once per chunk of content
+    Returns (header dict, list of entry dicts, True if stopped early).
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    header = dict()
+    entries = list()
+    path = list()
+    in_row = 0  # consecutive known entries
+    for k in range(0, max(len(content), 1), chunk_size):
+        parser.feed(content[k:k + chunk_size])
+        n = len(entries)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if not path and elem.tag not in ("rss", ATOM + "feed"):
+                    raise Unsupported(f"root element {elem.tag}")
+                path.append(elem.tag)
+                continue
+            path.pop()
+            if elem.tag in _ENTRY:
+                entries.append(_ENTRY[elem.tag](elem))
+                elem.clear()
+            else:
+                key = _HEADER.get((tuple(path), elem.tag))
+                if key and elem.text:
+                    header[key] = elem.text.strip()
+        if known_urls is not None and stop_after_known and len(entries) > n:
+            known = known_urls([entry["link"] for entry in entries[n:] if entry["link"]])
+            for i in range(n, len(entries)):
+                in_row = in_row + 1 if entries[i]["link"] in known else 0
+                if in_row >= stop_after_known:
+                    return header, entries[:i + 1], True
+    parser.close()
+    return header, entries, False
+
+if __name__ == "__main__":
+    pass
@@ -22,6 +22,11 @@ def read():
         _CONFIG = configparser.ConfigParser()
         _CONFIG.read(ini_file)
 
+def reload():
+    # the next call reads the ini file again
+    global _CONFIG
+    _CONFIG = None
+
 def get(section, key, default=None):
     read()
     if section in _CONFIG:
@@ -29,5 +34,10 @@ def get(section, key, default=None):
             return _CONFIG[section][key]
     return default
 
+def sections(prefix=""):
+    # {section: {key: value}} of all sections starting with prefix
+    read()
+    return {s: dict(_CONFIG[s]) for s in _CONFIG.sections() if s.startswith(prefix)}
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Keyword in context over the whole corpus, backed by a positional inverted index in each feed database.
+kwic_postings maps a (lower case) word to the documents and word positions where it occurs.
+The index is updated incrementally from parsed, rows parsed again are indexed again.
+
+Created: 18.10.26
+"""
+
+from array import array
+from collections import defaultdict
+import logging
+
+from luechenbresse import ini
+from luechenbresse import registry
+from luechenbresse import text
+
+PENDING_SQL = """
+    SELECT p.rowid, p.url, p.parser, p.plain, d.doc
+    FROM parsed p LEFT JOIN kwic_docs d ON d.url = p.url
+    WHERE p.rowid > ? AND ( d.url IS NULL OR d.parser IS NOT p.parser )
+    ORDER BY p.rowid
+    LIMIT ?
+"""
+
+
+def postings(plain):
+    # plain text -> dict word -> array of positions
+    positions = defaultdict(lambda: array("I"))
+    for i, word in enumerate(plain.split() if plain else []):
+        positions[word.lower()].append(i)
+    return positions
+
+def update(conn, chunk_size=None):
+    """
+    Index parsed rows not indexed yet or indexed with an older parser version.
+    Returns the number of documents indexed.
+    """
+    chunk_size = int(chunk_size or ini.get("kwic", "chunk_size", 500))
+    last = 0
+    cnt = 0
+    cur = conn.cursor()
+    while True:
+        rows = cur.execute(PENDING_SQL, (last, chunk_size)).fetchmany(chunk_size)
+        if not rows:
+            break
+        last = rows[-1][0]
+        with conn:
+            for _, url, parser, plain, doc in rows:
+                if doc is None:
+                    doc = conn.execute("INSERT INTO kwic_docs(url, parser) VALUES (?, ?)", (url, parser)).lastrowid
+                else:
+                    conn.execute("DELETE FROM kwic_postings WHERE doc = ?", (doc,))
+                    conn.execute("UPDATE kwic_docs SET parser = ? WHERE doc = ?", (parser, doc))
+                conn.executemany(
+                    "INSERT INTO kwic_postings(word, doc, positions) VALUES (?, ?, ?)",
+                    [(word, doc, pos.tobytes()) for word, pos in postings(plain).items()]
+                )
+        cnt += len(rows)
+    if cnt:
+        logging.info(f"kwic: indexed {cnt} documents")
+    return cnt
+
+def _positions(conn, word):
+    # doc -> set of positions for one word
+    result = dict()
+    for doc, blob in conn.execute("SELECT doc, positions FROM kwic_postings WHERE word = ?", (word,)):
+        pos = array("I")
+        pos.frombytes(blob)
+        result[doc] = set(pos)
+    return result
+
+def search(conn, term):
+    """
+    term: one or more words, matched case insensitive and consecutive
+    returns list of (url, ts, i, j), i..j being the word positions of the term in parsed.plain.split()
+    """
+    terms = [w for w in text.words(term.lower())]
+    if not terms:
+        return []
+    hits = _positions(conn, terms[0])
+    for k, word in enumerate(terms[1:], start=1):
+        if not hits:
+            break
+        following = _positions(conn, word)
+        hits = {
+            doc: {p for p in starts if p + k in following[doc]}
+            for doc, starts in hits.items() if doc in following
+        }
+    result = list()
+    for doc, starts in hits.items():
+        if not starts:
+            continue
+        url, ts = conn.execute("""
+            SELECT d.url, p.ts FROM kwic_docs d JOIN parsed p ON p.url = d.url WHERE d.doc = ?
+        """, (doc,)).fetchone()
+        for p in sorted(starts):
+            result.append((url, ts, p, p + len(terms) - 1))
+    result.sort(key=lambda x: (x[1] or "", x[2]))
+    return result
+
+def contexts(conn, term, width=5):
+    # list of (url, ts, (context, offset)) as needed by text.print_aligned_context
+    result = list()
+    plains = dict()
+    for url, ts, i, j in search(conn, term):
+        if url not in plains:
+            plain = conn.execute("SELECT plain FROM parsed WHERE url = ?", (url,)).fetchone()[0]
+            plains[url] = plain.split()
+        result.append((url, ts, text.context(plains[url], i, j, width=width)))
+    return result
+
+def kwic_all_feeds(term, width=5):
+    ctxs = list()
+    for feed in registry.registry().feeds():
+        feed._open_db()
+        try:
+            update(feed.conn)
+            found = contexts(feed.conn, term, width)
+            logging.info(f"{feed.name}: {len(found)} hits for '{term}'")
+            ctxs.extend(found)
+        finally:
+            feed._close_db()
+    if ctxs:
+        ctxs.sort(key=lambda x: x[1] or "")
+        text.print_aligned_context([ctx for _, _, ctx in ctxs])
+    return ctxs
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Import of legacy SQLite databases (used by lb-btci).
+bulk_import lets SQLite copy the rows itself (ATTACH DATABASE and INSERT ... SELECT),
+row_import reads tuples and inserts them via FeedAPI (needed e.g. when the HTML goes to the blob store).
+Both import in order of a key column and record the last imported key, so an interrupted run resumes there.
+
+Created: 18.10.26
+"""
+
+import sqlite3
+from datetime import datetime
+from time import perf_counter
+import logging
+
+COLUMNS = ("url", "rss_id", "title", "ts", "realised_ts", "dl_ts", "dl_http", "dl_dt", "html")
+
+
+def get_checkpoint(conn, source, schema="main"):
+    # -> (last_key, cnt), (None, 0) when starting from scratch
+    row = conn.execute(f"SELECT last_key, cnt FROM {schema}.import_checkpoints WHERE source = ?", (source,)).fetchone()
+    return row if row else (None, 0)
+
+def set_checkpoint(conn, source, last_key, cnt, schema="main"):
+    now = datetime.now().isoformat()[:19]
+    conn.execute(f"""
+        INSERT INTO {schema}.import_checkpoints(source, last_key, cnt, ts) VALUES (?, ?, ?, ?)
+            ON CONFLICT(source) DO UPDATE SET last_key = excluded.last_key, cnt = excluded.cnt, ts = excluded.ts
+    """, (source, last_key, cnt, now))
+
+def _where(key, lo, hi):
+    conditions = list()
+    args = list()
+    if lo is not None:
+        conditions.append(f"{key} > ?")
+        args.append(lo)
+    if hi is not None:
+        conditions.append(f"{key} <= ?")
+        args.append(hi)
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", args
+
+def _subquery(select_sql):
+    # SELECT_SQL as copied from the ini goes into FROM ( ... ), a trailing ; would break that
+    return select_sql.strip().rstrip(";").rstrip()
+
+def _progress(cnt, inserted, pc0):
+    dt = perf_counter() - pc0
+    logging.info(f"{cnt} rows read, {inserted} inserted, {cnt / dt if dt > 0 else 0:0.0f} rows/s")
+
+def bulk_import(legacy_db, target_db, select_sql, source, key="url", batch_size=10_000, max_batches=-1):
+    """
+    Copy the rows of <select_sql> (run against legacy_db) into target_db.articles, <batch_size> rows per transaction.
+    The key column should be indexed in the legacy database, otherwise each batch sorts the whole source.
+    Returns (rows read, rows inserted) of this run.
+    """
+    select_sql = _subquery(select_sql)
+    conn = sqlite3.connect(legacy_db)
+    try:
+        conn.execute("ATTACH DATABASE ? AS lb", (str(target_db),))
+        last, cnt = get_checkpoint(conn, source, "lb")
+        if last is not None:
+            logging.info(f"resuming after {key} = {last} ({cnt} rows read before)")
+        read = inserted = batches = 0
+        pc0 = perf_counter()
+        columns = ", ".join(COLUMNS)
+        selected = ", ".join("COALESCE(realised_ts, ?)" if c == "realised_ts" else c for c in COLUMNS)
+        while max_batches < 0 or batches < max_batches:
+            batches += 1
+            where, args = _where(key, last, None)
+            row = conn.execute(f"""
+                SELECT {key} FROM ({select_sql}) {where} ORDER BY {key} LIMIT 1 OFFSET ?
+            """, args + [batch_size - 1]).fetchone()
+            hi = row[0] if row else None
+            where, args = _where(key, last, hi)
+            n, new_last = conn.execute(f"SELECT count(*), max({key}) FROM ({select_sql}) {where}", args).fetchone()
+            if n == 0:
+                break
+            now = datetime.now().isoformat()[:19]
+            with conn:
+                cur = conn.execute(f"""
+                    INSERT OR IGNORE INTO lb.articles({columns})
+                        SELECT {selected} FROM ({select_sql}) {where} ORDER BY {key}
+                """, [now] + args)
+                inserted += cur.rowcount
+                read += n
+                last = new_last
+                set_checkpoint(conn, source, last, cnt + read, "lb")
+            _progress(read, inserted, pc0)
+            if hi is None:
+                break
+    finally:
+        conn.close()
+    return read, inserted
+
+def row_import(legacy_db, feed_api, select_sql, source, key="url", batch_size=1000, max_batches=-1):
+    """
+    Same as bulk_import, but rows are read as tuples and inserted by FeedAPI.insertrows (feed_api must be open).
+    One query over the whole source in key order, each batch is committed together with its checkpoint.
+    The key need not be unique: rows sharing the last key of a batch are held back for the next one,
+    so the checkpoint is always a key whose rows are all imported.
+    """
+    select_sql = _subquery(select_sql)
+    conn = feed_api.feed.conn
+    last, cnt = get_checkpoint(conn, source)
+    if last is not None:
+        logging.info(f"resuming after {key} = {last} ({cnt} rows read before)")
+    legacy_conn = sqlite3.connect(legacy_db)
+    read = inserted = batches = 0
+    pc0 = perf_counter()
+    try:
+        where, args = _where(key, last, None)
+        cur = legacy_conn.execute(f"SELECT * FROM ({select_sql}) {where} ORDER BY {key}", args)
+        names = [d[0] for d in cur.description]
+        k = names.index(key)
+        held = list()
+        while max_batches < 0 or batches < max_batches:
+            batches += 1
+            fetched = cur.fetchmany(batch_size)
+            rows = held + fetched
+            held = list()
+            if fetched:
+                j = len(rows)
+                while j > 0 and rows[j - 1][k] == rows[-1][k]:
+                    j -= 1
+                rows, held = rows[:j], rows[j:]
+            if rows:
+                inserted += feed_api.insertrows(names, rows)
+                read += len(rows)
+                set_checkpoint(conn, source, rows[-1][k], cnt + read)
+                feed_api.commit()
+                _progress(read, inserted, pc0)
+            if not fetched:
+                break
+    finally:
+        legacy_conn.close()
+    return read, inserted
+
+
+if __name__ == "__main__":
+    pass
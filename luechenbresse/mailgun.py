@@ -7,8 +7,8 @@ Convenience API to Mailgun
 Created: 11.05.20
 """
 
-import requests
 import logging
+from time import sleep
 
 from luechenbresse import ini
 
@@ -27,11 +27,23 @@ class Mailgun(object):
             cls.instance.active = cls.instance.url and cls.instance.auth_key and cls.instance.mail_from and cls.instance.mail_to
         return cls.instance
 
-    def shoot(self, subject, body):
+    def shoot(self, subject, body, attachments=None, timeout=None, retries=None, wait=2.0):
+        """
+        attachments: list of (file name, bytes)
+        Tries retries times with a timeout each and waits wait, 2*wait, ... seconds in between.
+        Returns True when Mailgun accepted the mail.
+        """
         if not self.active:
             logging.info("no mailgun account configured")
-        else:
-            logging.info(f"sending mail: {subject}")
+            return False
+        logging.info(f"sending mail: {subject}")
+        import requests
+        timeout = float(timeout or ini.get("mailgun", "timeout", 10))
+        retries = int(retries or ini.get("mailgun", "retries", 3))
+        files = [("attachment", (name, content)) for name, content in attachments or []]
+        for attempt in range(retries):
+            if attempt:
+                sleep(wait * 2 ** (attempt - 1))
             try:
                 r = requests.post(
                     self.url,
@@ -41,10 +53,18 @@ class Mailgun(object):
                         "to": self.mail_to,
                         "subject": subject,
                         "text": body
-                    })
+                    },
+                    files=files or None,
+                    timeout=timeout)
                 logging.info(f"HTTP {r.status_code}")
+                if r.status_code < 300:
+                    return True
+                if r.status_code < 500 and r.status_code != 429:
+                    # no use trying again
+                    return False
             except Exception as ex:
-                logging.exception(f"{ex.__class__.__name__}: {str(ex)}")
+                logging.warning(f"{ex.__class__.__name__}: {str(ex)}")
+        return False
 
 if __name__ == "__main__":
     pass
\ No newline at end of file
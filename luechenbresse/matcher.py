@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Finds all tracked terms (data/namen.txt) in a stream of words in one pass,
+multi-word names like "Kim Jong Un" included, and filters stop words (data/kill_list.txt).
+The term list is compiled into a token trie once; the compiled matcher is pickled to
+~/.luechenbresse/cache and only rebuilt when one of the data files changes.
+
+File format of both lists: one term per line, empty lines and lines starting with # are ignored.
+luechenbresse --names [--from DATE] [--to DATE] counts the names per feed and calendar week in parsed.
+
+Created: 18.10.26
+"""
+
+import os
+import pickle
+import hashlib
+from collections import Counter, deque
+from pathlib import Path
+import logging
+
+from luechenbresse import data
+from luechenbresse import registry
+from luechenbresse import text
+
+_CACHE_FORMAT = 2
+_END = ""   # key of the term in a trie node, never a word as text.words() drops empty words
+
+
+def read_list(name):
+    l = list()
+    for line in data.text(name).splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            l.append(line)
+    return l
+
+
+class Matcher:
+
+    def __init__(self, terms, stop_words=(), ignore_case=True):
+        self.ignore_case = ignore_case
+        self.stop_words = frozenset(self._norm(w) for w in stop_words)
+        self.trie = dict()
+        for term in terms:
+            node = self.trie
+            tokens = [self._norm(w) for w in text.words(term)]
+            if not tokens:
+                continue
+            for token in tokens:
+                node = node.setdefault(token, dict())
+            node[_END] = term
+
+    def _norm(self, word):
+        return word.casefold() if self.ignore_case else word
+
+    def find(self, words):
+        """
+        words: iterable of words, e.g. text.words(...) or plain.split()
+        yields (term, i, j) for every occurrence, i..j being the word positions, overlapping matches included
+        One pass over the words, only the matches still growing are kept, never more than the longest term has words.
+        """
+        active = deque()  # (start, trie node) of the matches still growing
+        for i, word in enumerate(words):
+            word = self._norm(word)
+            active.append((i, self.trie))
+            grown = deque()
+            for start, node in active:
+                node = node.get(word)
+                if node is None:
+                    continue
+                if _END in node:
+                    yield node[_END], start, i
+                grown.append((start, node))
+            active = grown
+
+    def count(self, words):
+        return Counter(term for term, _, _ in self.find(words))
+
+    def is_stop_word(self, word):
+        return self._norm(word) in self.stop_words
+
+    def without_stop_words(self, words):
+        stop_words = self.stop_words
+        return (w for w in words if self._norm(w) not in stop_words)
+
+
+def _key():
+    h = hashlib.sha256(str(_CACHE_FORMAT).encode())
+    for name in ("namen.txt", "kill_list.txt"):
+        h.update(data.get(name))
+    return h.hexdigest()
+
+def _cache_file():
+    return Path(os.environ["HOME"]) / ".luechenbresse" / "cache" / "matcher.pickle"
+
+def compiled():
+    """
+    The matcher for namen.txt and kill_list.txt, from cache when the data files did not change.
+    """
+    key = _key()
+    cache_file = _cache_file()
+    try:
+        with cache_file.open("rb") as f:
+            cached_key, matcher = pickle.load(f)
+        if cached_key == key:
+            return matcher
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logging.exception(f"ignoring {cache_file}")
+    logging.info("compiling matcher for namen.txt and kill_list.txt")
+    matcher = Matcher(read_list("namen.txt"), read_list("kill_list.txt"))
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with cache_file.open("wb") as f:
+            pickle.dump((key, matcher), f)
+    except OSError:
+        logging.exception(f"cannot write {cache_file}")
+    return matcher
+
+
+NAMES_SQL = """
+    SELECT calweek, plain FROM parsed
+    WHERE plain IS NOT NULL AND ts >= ? AND ts < ?
+    ORDER BY ts
+"""
+
+def names_by_week(conn, matcher, date_from=None, date_to=None):
+    """
+    Occurrences of the names in parsed articles from date_from up to date_to (exclusive).
+    Returns {calweek: Counter term -> occurrences}, {calweek: Counter term -> articles}
+    """
+    occurrences, articles = dict(), dict()
+    for calweek, plain in conn.execute(NAMES_SQL, (date_from or "", date_to or "9999")):
+        found = matcher.count(plain.split())
+        if found:
+            occurrences.setdefault(calweek, Counter()).update(found)
+            articles.setdefault(calweek, Counter()).update(found.keys())
+    return occurrences, articles
+
+def names_all_feeds(date_from=None, date_to=None):
+    m = compiled()
+    if not m.trie:
+        logging.warning("namen.txt lists no names")
+        return
+    print(f"{'feed':16} {'calweek':8} {'name':32} {'count':>7} {'articles':>8}")
+    for feed in registry.registry().feeds():
+        feed._open_db()
+        try:
+            occurrences, articles = names_by_week(feed.conn, m, date_from, date_to)
+        finally:
+            feed._close_db()
+        for calweek in sorted(occurrences):
+            for term, n in occurrences[calweek].most_common():
+                print(f"{feed.name:16} {calweek:8} {term:32} {n:7d} {articles[calweek][term]:8d}")
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Timing metrics per stage (feed fetch, feed parse, dedup, download, db write, commit, html parse) and host.
+Durations are collected in memory during a run; write() appends one JSON line per run to
+~/.luechenbresse/metrics.jsonl with count, sum, percentiles and a histogram per stage and host.
+report() shows p50/p95/p99 and throughput (samples per second of wall time of the run) over the last runs
+(luechenbresse --stats).
+count() keeps simple counters per feed (new and known entries, downloads per HTTP status) for the run report.
+
+Created: 18.10.26
+"""
+
+import os
+import json
+import math
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+import logging
+
+# upper bounds of the histogram buckets in ms, the last bucket is everything above
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+_SAMPLES = defaultdict(list)    # (stage, host) -> list of seconds
+_COUNTS = defaultdict(Counter)  # feed -> key -> n
+_LOCK = threading.Lock()
+_STARTED = perf_counter()       # start of the run, or of the interval since the last reset()
+
+
+def record(stage, seconds, host=None):
+    with _LOCK:
+        _SAMPLES[(stage, host or "")].append(seconds)
+
+def count(name, key, n=1):
+    with _LOCK:
+        _COUNTS[name][key] += n
+
+def counts():
+    with _LOCK:
+        return {name: dict(c) for name, c in sorted(_COUNTS.items())}
+
+@contextmanager
+def timer(stage, host=None):
+    pc = perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, perf_counter() - pc, host)
+
+def percentile(values, q):
+    # values sorted, q in 0..100, nearest rank
+    if not values:
+        return None
+    k = max(0, min(len(values) - 1, math.ceil(q / 100.0 * len(values)) - 1))
+    return values[k]
+
+def summary():
+    with _LOCK:
+        samples = {k: sorted(v) for k, v in _SAMPLES.items()}
+    result = list()
+    for (stage, host), values in sorted(samples.items()):
+        hist = [0] * (len(BUCKETS_MS) + 1)
+        for v in values:
+            hist[bisect_left(BUCKETS_MS, v * 1000.0)] += 1
+        result.append({
+            "stage": stage,
+            "host": host,
+            "n": len(values),
+            "sum": sum(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": values[-1],
+            "hist": hist,
+        })
+    return result
+
+def reset():
+    global _STARTED
+    with _LOCK:
+        _SAMPLES.clear()
+        _COUNTS.clear()
+        _STARTED = perf_counter()
+
+def wall_time():
+    # seconds since the start of the run or the last reset()
+    return perf_counter() - _STARTED
+
+def metrics_file():
+    return Path(os.environ["HOME"]) / ".luechenbresse" / "metrics.jsonl"
+
+def write(command=None, path=None):
+    stages = summary()
+    if not stages:
+        return
+    path = Path(path or metrics_file())
+    line = {"run": datetime.now().isoformat()[:19], "command": command, "wall": wall_time(), "buckets_ms": BUCKETS_MS,
+            "stages": stages, "counts": counts()}
+    with path.open("a") as f:
+        f.write(json.dumps(line) + "\n")
+    logging.info(f"metrics of {len(stages)} stages written to {path}")
+
+def read(path=None, runs=10):
+    path = Path(path or metrics_file())
+    if not path.exists():
+        return []
+    with path.open() as f:
+        lines = f.readlines()
+    return [json.loads(line) for line in lines[-runs:] if line.strip()]
+
+def report(path=None, runs=10):
+    # prints latency percentiles and throughput per stage and host for the last runs, oldest first
+    # runs written before the wall time was recorded show no throughput
+    runs = read(path, runs)
+    if not runs:
+        print("no metrics recorded yet")
+        return
+    rows = defaultdict(list)
+    for run in runs:
+        for s in run["stages"]:
+            rows[(s["stage"], s["host"])].append((run["run"], run.get("wall"), s))
+    for (stage, host), l in sorted(rows.items()):
+        print(f"{stage} {host}".rstrip())
+        print(f"    {'run':19} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per s':>8}")
+        for ts, wall, s in l:
+            rate = f"{s['n'] / wall:8.2f}" if wall else f"{'-':>8}"
+            print(f"    {ts:19} {s['n']:6d} {s['p50'] * 1000:9.1f} {s['p95'] * 1000:9.1f} {s['p99'] * 1000:9.1f} {rate}")
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Versioned schema migrations for the feed databases.
+The version reached is kept in PRAGMA user_version, step 1 is the plain schema file.
+New steps are appended to the list of their schema, never edited once released.
+
+Created: 18.10.26
+"""
+
+import logging
+
+from luechenbresse import data
+
+
+def _add_column(conn, table, column, decl):
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def _html_blobs(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS html_blobs (
+            hash TEXT PRIMARY KEY,      -- sha256 of the utf-8 encoded html
+            codec TEXT,                 -- zlib | zstd
+            size INTEGER,               -- uncompressed size in bytes
+            data BLOB
+        )
+    """)
+    _add_column(conn, "articles", "html_ref", "TEXT")
+
+def _download_retries(conn):
+    # retry state per article, see retry.py
+    _add_column(conn, "articles", "dl_attempts", "INTEGER")     # failed and successful downloads
+    _add_column(conn, "articles", "dl_error", "TEXT")           # like 'HTTP 404' or 'ReadTimeout'
+    _add_column(conn, "articles", "dl_next_ts", "TEXT")         # iso timestamp, not to be tried before
+    _add_column(conn, "articles", "dl_parked", "INTEGER")       # 1: given up
+    # the WHERE clause must match feed.BACKLOG_SQL exactly
+    conn.execute("DROP INDEX IF EXISTS articles_backlog")
+    conn.execute("""
+        CREATE INDEX articles_backlog ON articles(ts)
+            WHERE ( dl_http != 200 OR dl_http IS NULL ) AND url != '' AND dl_parked IS NULL
+    """)
+
+
+MIGRATIONS = {
+    "db-core.sql": [
+        (1, "db-core.sql"),
+        (2, """
+            -- ETag and Last-Modified of the last GET of the feed
+            CREATE TABLE IF NOT EXISTS feed_http (
+                feed TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                checked_ts TEXT
+            );
+        """),
+        (3, _html_blobs),
+        (4, """
+            -- pending downloads, articles_backlog is replaced by migration 9 (see feed.BACKLOG_SQL)
+            CREATE INDEX IF NOT EXISTS articles_backlog ON articles(ts)
+                WHERE ( dl_http != 200 OR dl_http IS NULL ) AND url != '';
+            CREATE INDEX IF NOT EXISTS articles_ts ON articles(ts);
+            CREATE INDEX IF NOT EXISTS parsed_calweek ON parsed(calweek);
+            CREATE INDEX IF NOT EXISTS words_by_week_calweek ON words_by_week(calweek);
+        """),
+        (5, """
+            -- parsed rows already added to words_by_week, with the values they were counted with
+            CREATE TABLE IF NOT EXISTS words_counted (
+                url TEXT PRIMARY KEY,
+                calweek TEXT,
+                parser INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS words_counted_calweek ON words_counted(calweek);
+        """),
+        (6, """
+            -- positional inverted index over parsed.plain, see kwic.py
+            CREATE TABLE IF NOT EXISTS kwic_docs (
+                doc INTEGER PRIMARY KEY,    -- stable id, parsed.rowid may change on VACUUM
+                url TEXT UNIQUE,            -- foreign key to parsed
+                parser INTEGER              -- parser version of the indexed text
+            );
+            CREATE TABLE IF NOT EXISTS kwic_postings (
+                word TEXT,                  -- lower case
+                doc INTEGER,                -- foreign key to kwic_docs
+                positions BLOB,             -- array('I') of word positions in parsed.plain.split()
+                PRIMARY KEY(word, doc)
+            ) WITHOUT ROWID;
+        """),
+        (7, """
+            -- progress of legacy imports (lb-btci), so interrupted runs can resume
+            CREATE TABLE IF NOT EXISTS import_checkpoints (
+                source TEXT PRIMARY KEY,    -- ini file and legacy database
+                last_key TEXT,              -- last imported value of the key column
+                cnt INTEGER,                -- rows read so far
+                ts TEXT                     -- iso timestamp of the checkpoint
+            );
+        """),
+        (8, """
+            -- latest articles per feed, for the poll interval of the daemon
+            CREATE INDEX IF NOT EXISTS articles_realised ON articles(realised_ts);
+        """),
+        (9, _download_retries),
+        (10, """
+            -- archive index pages crawled completely, see archive.py
+            CREATE TABLE IF NOT EXISTS archive_days (
+                day TEXT PRIMARY KEY,       -- iso date
+                url TEXT,                   -- of the index page
+                found INTEGER,              -- article links on the page
+                new INTEGER,                -- of those not known before
+                ts TEXT                     -- iso timestamp of the crawl
+            );
+        """),
+        (11, """
+            -- revisit mode, see revisit.py
+            CREATE TABLE IF NOT EXISTS article_revisits (
+                url TEXT PRIMARY KEY,       -- foreign key to articles
+                etag TEXT,                  -- of the last GET
+                last_modified TEXT,
+                hash TEXT,                  -- normalized content hash of the latest version
+                checks INTEGER,             -- revisits so far
+                changes INTEGER,            -- revisits that found a new version
+                next_ts TEXT                -- iso timestamp of the next revisit
+            );
+            -- versions after the first download, which stays in articles
+            CREATE TABLE IF NOT EXISTS article_revisions (
+                url TEXT,                   -- foreign key to articles
+                ts TEXT,                    -- iso timestamp of the download
+                hash TEXT,                  -- normalized content hash
+                html TEXT,
+                html_ref TEXT,              -- see blobstore.py
+                PRIMARY KEY(url, ts)
+            );
+        """),
+    ],
+}
+
+
+def version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn, schema="db-core.sql", target=None):
+    """
+    Bring the database to the latest version (or to <target>) of <schema>.
+    Each step runs in a transaction of its own that also sets the new version number, so a step that
+    fails leaves neither its changes nor its version behind.
+    Returns the version reached.
+    """
+    # TODO support more than one schema per db
+    if isinstance(schema, list):
+        schema = schema[0]
+    current = version(conn)
+    for step_version, step in MIGRATIONS[schema]:
+        if step_version <= current:
+            continue
+        if target is not None and step_version > target:
+            break
+        logging.info(f"migrating to {schema} version {step_version}")
+        conn.commit()
+        try:
+            if callable(step):
+                conn.execute("BEGIN")
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {step_version}")
+                conn.commit()
+            else:
+                # executescript commits before it starts, the transaction has to be part of the script
+                sql = data.schema(step) if step.endswith(".sql") else step
+                conn.executescript(f"BEGIN;\n{sql};\nPRAGMA user_version = {step_version};\nCOMMIT;")
+        except Exception:
+            conn.rollback()
+            raise
+        current = step_version
+    return current
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Extraction of the text hidden in the downloaded HTML into the parsed table.
+Articles are read in chunks (keyset on articles.rowid), so the archive never is in memory as a whole.
+Only articles without parsed row, or parsed by an older PARSER_VERSION of the feed adapter, are processed.
+Configuration in luechenbresse.ini:
+[parse]
+chunk_size = 200        articles per chunk
+workers = 4             processes parsing in parallel, defaults to the number of cores
+
+Created: 18.10.26
+"""
+
+import os
+import json
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from time import perf_counter
+import logging
+
+from luechenbresse import ini
+from luechenbresse import registry
+from luechenbresse import text
+from luechenbresse import extract
+from luechenbresse import kwic
+from luechenbresse import metrics
+
+PENDING_SQL = """
+    SELECT a.rowid, a.url, a.ts, a.html, a.html_ref
+    FROM articles a LEFT JOIN parsed p ON p.url = a.url
+    WHERE a.rowid > ? AND a.dl_http = 200 AND ( p.parser IS NULL OR p.parser < ? )
+    ORDER BY a.rowid
+    LIMIT ?
+"""
+
+UPSERT_SQL = """
+    INSERT INTO parsed(url, ts, text_json, meta_json, plain, calweek, dow, parser)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(url) DO UPDATE SET
+            ts = excluded.ts, text_json = excluded.text_json, meta_json = excluded.meta_json,
+            plain = excluded.plain, calweek = excluded.calweek, dow = excluded.dow, parser = excluded.parser
+"""
+
+
+def parse_rows(adapter, rows):
+    """
+    adapter: the FeedAdapter of the feed, pickled when this runs in a worker process
+    rows: list of (url, ts, html)
+    returns list of tuples for UPSERT_SQL, list of (url, traceback) of the articles that could not be parsed
+    Nothing is logged here: a worker process has no working log handlers, the caller logs the errors.
+    """
+    version = adapter.PARSER_VERSION
+    result, errors = list(), list()
+    for url, ts, html in rows:
+        try:
+            structure, meta = adapter.parse_article(html or "")
+            text_json = json.dumps(structure, ensure_ascii=False)
+            meta_json = json.dumps(meta, ensure_ascii=False)
+            plain = text.sjoin(structure)
+        except Exception as ex:
+            # stored anyway, so the article is not tried again until the next parser version
+            errors.append((url, traceback.format_exc()))
+            text_json, plain = None, None
+            meta_json = json.dumps({"error": f"{ex.__class__.__name__}: {ex}"})
+        calweek = extract.calweek(ts) if ts else None
+        dow = extract.dow(ts) if ts else None
+        result.append((url, ts, text_json, meta_json, plain, calweek, dow, version))
+    return result, errors
+
+def timed_parse_rows(adapter, rows):
+    # parse_rows plus the seconds it took, measured where it runs (maybe a worker process)
+    pc = perf_counter()
+    parsed, errors = parse_rows(adapter, rows)
+    return parsed, errors, perf_counter() - pc
+
+def _worker_init():
+    # forked workers inherit the root handlers, in queue mode a QueueHandler nobody listens to
+    logger = logging.getLogger()
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+
+def pending_chunks(feed, version, chunk_size):
+    # yields lists of (url, ts, html) until no pending article is left
+    last = 0
+    cur = feed.conn.cursor()
+    while True:
+        cur.execute(PENDING_SQL, (last, version, chunk_size))
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        last = rows[-1][0]
+        yield [(url, ts, feed.html_store.resolve(html, ref)) for _, url, ts, html, ref in rows]
+
+def _parsed_chunks(feed, chunks, workers):
+    # yields the results of timed_parse_rows per chunk, in the order of completion when run in a process pool
+    if workers <= 1:
+        for rows in chunks:
+            yield timed_parse_rows(feed.adapter, rows)
+        return
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init) as executor:
+        for rows in chunks:
+            pending.add(executor.submit(timed_parse_rows, feed.adapter, rows))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+def parse_feed(feed, chunk_size=None, workers=None):
+    """
+    Parse pending articles of an opened or unopened Feed.
+    With workers > 1 the parsing runs in a process pool, this process stays the only one writing to the database.
+    Returns the number of articles parsed.
+    """
+    chunk_size = int(chunk_size or ini.get("parse", "chunk_size", 200))
+    workers = int(workers or ini.get("parse", "workers", os.cpu_count() or 1))
+    version = feed.adapter.PARSER_VERSION
+    logging.info(f"Parsing {feed.name} with parser version {version}, {workers} worker(s)")
+    private_connection = False
+    if not feed.cur:
+        private_connection = True
+        feed._open_db()
+    cnt = 0
+    pc0 = perf_counter()
+    try:
+        chunks = pending_chunks(feed, version, chunk_size)
+        for parsed, errors, seconds in _parsed_chunks(feed, chunks, workers):
+            metrics.record("html parse", seconds, feed.name)
+            for url, tb in errors:
+                logging.error(f"cannot parse {url}\n{tb.rstrip()}")
+            with metrics.timer("db write", feed.name), feed.conn:
+                feed.cur.executemany(UPSERT_SQL, parsed)
+            cnt += len(parsed)
+            logging.info(f"{feed.name}: {cnt} articles parsed, {cnt / (perf_counter() - pc0):0.1f} articles/s")
+        kwic.update(feed.conn)
+    finally:
+        if private_connection:
+            feed._close_db()
+    dt = perf_counter() - pc0
+    rate = cnt / dt if dt > 0 else 0.0
+    logging.info(f"{feed.name}: parsed {cnt} articles in {dt:0.1f}s ({rate:0.1f} articles/s)")
+    return cnt
+
+def parse_all_feeds(workers=None):
+    for feed in registry.registry().feeds():
+        parse_feed(feed, workers=workers)
+
+
+if __name__ == "__main__":
+    pass
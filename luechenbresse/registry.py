@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+All feeds of this installation, built once per process: the packaged feeds.json plus feeds
+defined in luechenbresse.ini. Definitions are validated, database paths and feed adapters resolved
+up front; Feed instances are created once and handed out again on every call.
+
+A feed of your own, or changes to a packaged one (only the keys given are replaced):
+[feed:NAME]
+type = rss
+feed = https://example.com/rss
+db = NAME.sqlite            in the database folder, see [databases]
+schema = db-core.sql
+module = luechenbresse.NAME the FeedAdapter, see adapter.py
+enabled = yes               no: the feed is skipped
+
+Created: 18.10.26
+"""
+
+from pathlib import Path
+from urllib.parse import urlsplit
+import logging
+
+from luechenbresse import ini
+from luechenbresse import data
+from luechenbresse import migrations
+from luechenbresse import adapter
+
+SECTION_PREFIX = "feed:"
+TYPES = ("rss",)
+REQUIRED = ("type", "feed", "db", "schema")
+
+_REGISTRY = None
+
+
+def _from_ini(section):
+    d = dict(section)
+    if "schema" in d:
+        d["schema"] = [s.strip() for s in d["schema"].split(",") if s.strip()]
+    if "enabled" in d:
+        d["enabled"] = d["enabled"].strip().lower() in ("yes", "true", "on", "1")
+    return d
+
+def merged(packaged, user_sections):
+    """
+    packaged: like feeds.json, user_sections: {"feed:NAME": {key: str}} like in the ini file
+    Returns the definitions of the enabled feeds.
+    """
+    definitions = {name: dict(d) for name, d in packaged.items()}
+    for section, values in user_sections.items():
+        name = section[len(SECTION_PREFIX):].strip()
+        definitions.setdefault(name, dict()).update(_from_ini(values))
+    return {name: d for name, d in definitions.items() if d.get("enabled", True)}
+
+def validate(definitions):
+    problems = list()
+    db_files = dict()
+    for name, d in definitions.items():
+        missing = [key for key in REQUIRED if not d.get(key)]
+        if missing:
+            problems.append(f"{name}: missing {', '.join(missing)}")
+            continue
+        if d["type"] not in TYPES:
+            problems.append(f"{name}: unknown type {d['type']}")
+        if urlsplit(d["feed"]).scheme not in ("http", "https"):
+            problems.append(f"{name}: feed is no http(s) URL: {d['feed']}")
+        for schema in d["schema"]:
+            if schema not in migrations.MIGRATIONS:
+                problems.append(f"{name}: unknown schema {schema}")
+        if d["db"] in db_files:
+            problems.append(f"{name}: db {d['db']} is used by {db_files[d['db']]}, too")
+        db_files[d["db"]] = name
+    if problems:
+        raise ValueError("feed definitions: " + "; ".join(problems))
+
+def load_adapter(name, module_name=None, eps=None):
+    return adapter.load(name, module_name, eps)
+
+
+class Registry:
+
+    def __init__(self, definitions, db_folder=None):
+        validate(definitions)
+        self.definitions = definitions
+        self.db_folder = Path(db_folder) if db_folder else None
+        # entry points are looked up once for all feeds
+        eps = adapter.entry_points() if any("module" not in d for d in definitions.values()) else dict()
+        self.adapters = {name: load_adapter(name, d.get("module"), eps) for name, d in definitions.items()}
+        self._feeds = dict()
+
+    def names(self):
+        return list(self.definitions)
+
+    def db_file(self, name):
+        if self.db_folder is None:
+            raise ValueError(f"No database folder specified in luechenbresse.ini")
+        return self.db_folder / self.definitions[name]["db"]
+
+    def feed(self, name):
+        if name not in self._feeds:
+            from luechenbresse.feed import Feed
+            d = self.definitions[name]
+            self._feeds[name] = Feed(name, d["feed"], d["type"], self.db_file(name), d["schema"],
+                                     adapter=self.adapters[name])
+        return self._feeds[name]
+
+    def feeds(self):
+        return [self.feed(name) for name in self.definitions]
+
+
+def registry():
+    """
+    The registry of this process, from feeds.json and luechenbresse.ini as read at the first call.
+    """
+    global _REGISTRY
+    if _REGISTRY is None:
+        definitions = merged(data.feeds(), ini.sections(SECTION_PREFIX))
+        _REGISTRY = Registry(definitions, ini.get("databases", "folder"))
+        logging.info(f"{len(definitions)} feeds: {', '.join(definitions)}")
+    return _REGISTRY
+
+def reset():
+    global _REGISTRY
+    _REGISTRY = None
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Run report via Mailgun: a short summary in the mail body (counts per feed, warnings and errors,
+latency percentiles) and the complete current.log gzip-compressed as attachment, cut to a maximum size.
+Reports are written to ~/.luechenbresse/spool first and delivered by a detached process
+(python -m luechenbresse.report), so the run itself ends right away. Undelivered reports stay in the
+spool and are tried again after the next run.
+Configuration in luechenbresse.ini (defaults shown):
+[report]
+attach_log = yes
+max_attachment = 2000000    bytes, compressed
+max_errors = 20             warnings and errors quoted in the summary
+keep_days = 7               undelivered reports are dropped after so many days
+detach = yes                no: deliver before the run ends
+[mailgun]
+timeout = 10                seconds per attempt
+retries = 3
+
+Created: 18.10.26
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import gzip
+import shutil
+import socket
+import subprocess
+from datetime import datetime, timedelta
+from pathlib import Path
+import logging
+
+from luechenbresse import ini
+from luechenbresse import metrics
+
+# first line of a log record, see LogManager
+_RECORD = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d+ \[(\w+)\] ")
+_CONTEXT = 10   # lines of a traceback quoted
+
+
+def spool_folder():
+    return Path(os.environ["HOME"]) / ".luechenbresse" / "spool"
+
+def error_excerpts(log_file, max_errors=20):
+    """
+    Returns (number of warnings and errors, the first max_errors of them with their tracebacks).
+    Reads the log line by line.
+    """
+    excerpts = list()
+    cnt = 0
+    current = None
+    with Path(log_file).open(errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            m = _RECORD.match(line)
+            if m:
+                current = None
+                if m.group(1) in ("WARNING", "ERROR", "CRITICAL"):
+                    cnt += 1
+                    if len(excerpts) < max_errors:
+                        current = [line]
+                        excerpts.append(current)
+            elif current is not None and len(current) <= _CONTEXT:
+                current.append(line)
+    return cnt, ["\n".join(l) for l in excerpts]
+
+def _gzip(f, start, size):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", mtime=0) as gz:
+        f.seek(start)
+        if start:
+            f.readline()    # rest of a cut line
+            gz.write(f"[... first {f.tell()} of {size} bytes cut ...]\n".encode())
+        shutil.copyfileobj(f, gz)
+    return buf.getvalue()
+
+def compressed_log(log_file, max_size):
+    """
+    gzip of the log file, only the end of it when the complete file does not fit into max_size bytes.
+    """
+    size = Path(log_file).stat().st_size
+    start = 0
+    with Path(log_file).open("rb") as f:
+        while True:
+            data = _gzip(f, start, size)
+            if len(data) <= max_size or start >= size:
+                return data
+            # estimate from the compression ratio so far, a bit less to get there quickly
+            keep = int((size - start) * max_size / len(data) * 0.9)
+            start = max(start + 1, size - keep)
+
+def summary(log_file=None, max_errors=20):
+    lines = [f"luechenbresse on {socket.gethostname()}, {datetime.now().isoformat()[:19]}", ""]
+    counts = metrics.counts()
+    if counts:
+        lines.append("Feeds")
+        for name, c in counts.items():
+            http = ", ".join(f"{k}: {v}" for k, v in sorted(c.items()) if k.startswith("HTTP"))
+            lines.append(f"    {name}: {c.get('new', 0)} new, {c.get('known', 0)} known"
+                         + (f", downloads {http}" if http else ""))
+        lines.append("")
+    stages = metrics.summary()
+    if stages:
+        lines.append("Latency")
+        lines.append(f"    {'stage':32} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for s in stages:
+            label = f"{s['stage']} {s['host']}".rstrip()
+            lines.append(f"    {label[:32]:32} {s['n']:6d} {s['p50'] * 1000:9.1f} {s['p95'] * 1000:9.1f} "
+                         f"{s['p99'] * 1000:9.1f}")
+        lines.append("")
+    if log_file is not None:
+        cnt, excerpts = error_excerpts(log_file, max_errors)
+        lines.append(f"Warnings and errors: {cnt}")
+        for excerpt in excerpts:
+            lines.append("    " + excerpt.replace("\n", "\n    "))
+        if cnt > len(excerpts):
+            lines.append(f"    ... and {cnt - len(excerpts)} more")
+    return "\n".join(lines)
+
+def spool(subject, body, attachments=(), folder=None):
+    """
+    attachments: list of (file name, bytes)
+    Written to a hidden folder and renamed, so a deliverer never sees half a report.
+    """
+    folder = Path(folder or spool_folder())
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    tmp = folder / f".{name}"
+    tmp.mkdir(parents=True)
+    (tmp / "mail.json").write_text(json.dumps({"subject": subject, "text": body,
+                                               "attachments": [a for a, _ in attachments]}))
+    for file_name, content in attachments:
+        (tmp / file_name).write_bytes(content)
+    tmp.rename(folder / name)
+    logging.info(f"report spooled to {folder / name}")
+    return folder / name
+
+def deliver(folder=None, keep_days=None, timeout=None, retries=None, wait=2.0):
+    """
+    Sends all reports in the spool, oldest first; returns the number delivered.
+    Only one deliverer at a time works on the spool.
+    """
+    import fcntl
+    from luechenbresse.mailgun import Mailgun
+    folder = Path(folder or spool_folder())
+    keep_days = float(keep_days or ini.get("report", "keep_days", 7))
+    if not folder.exists():
+        return 0
+    with (folder / ".lock").open("w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logging.info("another deliverer is at work")
+            return 0
+        cnt = 0
+        for entry in sorted(p for p in folder.iterdir() if p.is_dir() and not p.name.startswith(".")):
+            mtime = datetime.fromtimestamp(entry.stat().st_mtime)
+            if datetime.now() - mtime > timedelta(days=keep_days):
+                logging.warning(f"dropping undelivered report {entry.name}")
+                shutil.rmtree(entry)
+                continue
+            mail = json.loads((entry / "mail.json").read_text())
+            attachments = [(a, (entry / a).read_bytes()) for a in mail["attachments"]]
+            if Mailgun().shoot(mail["subject"], mail["text"], attachments, timeout=timeout, retries=retries,
+                               wait=wait):
+                shutil.rmtree(entry)
+                cnt += 1
+            else:
+                logging.warning(f"report {entry.name} stays in the spool")
+        return cnt
+
+def send(log_file, subject):
+    """
+    Spool the report of this run and have it delivered, by a detached process unless detach = no.
+    """
+    from luechenbresse.mailgun import Mailgun
+    if not Mailgun().active:
+        logging.info("no mailgun account configured")
+        return
+    max_errors = int(ini.get("report", "max_errors", 20))
+    attachments = list()
+    if ini.get("report", "attach_log", "yes").lower() in ("yes", "true", "on", "1"):
+        data = compressed_log(log_file, int(ini.get("report", "max_attachment", 2_000_000)))
+        attachments.append((Path(log_file).name + ".gz", data))
+    spool(subject, summary(log_file, max_errors), attachments)
+    if ini.get("report", "detach", "yes").lower() in ("yes", "true", "on", "1"):
+        subprocess.Popen([sys.executable, "-m", "luechenbresse.report"],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True, close_fds=True)
+        logging.info("report delivery detached")
+    else:
+        deliver()
+
+
+if __name__ == "__main__":
+    # the detached deliverer, logs next to the spool
+    spool_folder().mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(level=logging.INFO, filename=spool_folder() / "deliver.log",
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+    deliver()
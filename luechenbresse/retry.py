@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+When to try a failed article download again.
+Permanent failures (404, 410, 451) wait long and are parked after a few attempts, transient ones
+(5xx, 429, timeouts, connection errors as HTTP 999, anything else) wait with exponential backoff.
+Parked articles are left out of the backlog for good; UPDATE articles SET dl_parked = NULL brings them back.
+Configuration in luechenbresse.ini (defaults shown):
+[retry]
+base = 600                  seconds before the 2nd attempt of a transient failure, doubled each time
+max_delay = 172800          never wait longer than 2 days
+max_attempts = 8            parked after so many transient failures
+permanent_base = 86400      seconds before the 2nd attempt of a permanent failure, doubled each time
+permanent_attempts = 3      parked after so many permanent failures
+
+Created: 18.10.26
+"""
+
+from datetime import timedelta
+
+from luechenbresse import ini
+
+PERMANENT = (404, 410, 451)
+
+
+def error_class(r):
+    # r like returned by feed.get(); None when the download worked
+    if r.status_code == 200:
+        return None
+    error = getattr(r, "error", None)
+    return error or f"HTTP {r.status_code}"
+
+def is_permanent(status_code):
+    return status_code in PERMANENT
+
+def next_attempt(status_code, attempts, now, policy=None):
+    """
+    status_code: of the failed download, attempts: number of failed attempts including this one
+    Returns (next eligible datetime, parked)
+    """
+    policy = policy or Policy()
+    if is_permanent(status_code):
+        if attempts >= policy.permanent_attempts:
+            return None, True
+        delay = policy.permanent_base * 2 ** (attempts - 1)
+    else:
+        if attempts >= policy.max_attempts:
+            return None, True
+        delay = policy.base * 2 ** (attempts - 1)
+    return now + timedelta(seconds=min(delay, policy.max_delay)), False
+
+
+class Policy:
+
+    def __init__(self, base=None, max_delay=None, max_attempts=None, permanent_base=None, permanent_attempts=None):
+        self.base = float(base or ini.get("retry", "base", 600))
+        self.max_delay = float(max_delay or ini.get("retry", "max_delay", 172800))
+        self.max_attempts = int(max_attempts or ini.get("retry", "max_attempts", 8))
+        self.permanent_base = float(permanent_base or ini.get("retry", "permanent_base", 86400))
+        self.permanent_attempts = int(permanent_attempts or ini.get("retry", "permanent_attempts", 3))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Revisit mode (luechenbresse --revisit): recent articles are downloaded again to catch later edits.
+The first download stays in articles, batch runs never overwrite an article with HTTP 200. A revisit
+sends If-None-Match / If-Modified-Since from the previous one; on 200 the text is extracted with the
+feed adapter and hashed with whitespace normalized, so changing ads, tracking ids or timestamps in the
+HTML do not count. Only a new hash is stored as a revision in article_revisions.
+The k-th revisit of an article comes first * factor ** (k - 1) seconds after the previous download,
+articles older than max_age_days are left alone. article_revisits keeps the schedule and the number
+of changes found per article.
+Configuration in luechenbresse.ini (defaults shown):
+[revisit]
+first = 3600                seconds after the download
+factor = 2
+max_age_days = 7
+limit = 500                 articles per feed and run
+
+Created: 18.10.26
+"""
+
+import hashlib
+import re
+from datetime import datetime, timedelta
+import logging
+
+from luechenbresse import ini
+from luechenbresse import metrics
+from luechenbresse import registry
+from luechenbresse import session
+from luechenbresse import text
+from luechenbresse.download import Downloader, interleave
+
+# newest first, articles without revisit so far are due first after their download
+DUE_SQL = """
+    SELECT a.url, a.ts, a.title, a.html, a.html_ref, v.etag, v.last_modified, v.hash, v.checks, v.changes
+    FROM articles a LEFT JOIN article_revisits v ON v.url = a.url
+    WHERE a.dl_http = 200 AND a.ts >= ?
+        AND ( ( v.url IS NULL AND a.dl_ts <= ? ) OR v.next_ts <= ? )
+    ORDER BY a.ts DESC
+    LIMIT ?
+"""
+REVISIT_SQL = """
+    INSERT OR REPLACE INTO article_revisits(url, etag, last_modified, hash, checks, changes, next_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+REVISION_SQL = "INSERT OR IGNORE INTO article_revisions(url, ts, hash, html, html_ref) VALUES (?, ?, ?, ?, ?)"
+
+_SCRIPTS = re.compile(r"<(script|style)\b.*?</\1\s*>", re.S | re.I)
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def _normalized(s):
+    return " ".join(s.split())
+
+def content_hash(adapter, html):
+    """
+    sha256 of the article text as extracted by the adapter, whitespace normalized.
+    Pages the adapter finds no text in are hashed by their visible text instead.
+    """
+    if html is None:
+        return None
+    try:
+        content, _ = adapter.parse_article(html)
+        parts = [_normalized(s) for s in text.strings(content)]
+    except Exception:
+        logging.exception("parse_article failed, hashing the visible text")
+        parts = []
+    if not any(parts):
+        parts = [_normalized(_TAGS.sub(" ", _SCRIPTS.sub(" ", html)))]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def next_revisit(now, checks, first=3600, factor=2.0):
+    # checks: revisits done including the current one
+    return now + timedelta(seconds=first * factor ** max(checks - 1, 0))
+
+
+class Revisits:
+
+    def __init__(self):
+        self.first = float(ini.get("revisit", "first", 3600))
+        self.factor = float(ini.get("revisit", "factor", 2))
+        self.max_age_days = float(ini.get("revisit", "max_age_days", 7))
+        self.limit = int(ini.get("revisit", "limit", 500))
+
+    def due(self, feed, now):
+        oldest = (now - timedelta(days=self.max_age_days)).isoformat()[:19]
+        downloaded = (now - timedelta(seconds=self.first)).isoformat()[:19]
+        rows = feed.conn.execute(DUE_SQL, (oldest, downloaded, now.isoformat()[:19], self.limit)).fetchall()
+        a = list()
+        for url, ts, title, html, html_ref, etag, last_modified, hash_, checks, changes in rows:
+            if hash_ is None:
+                # first revisit: compare with the first download
+                hash_ = content_hash(feed.adapter, feed.html_store.resolve(html, html_ref))
+            a.append({
+                "url": url,
+                "ts": ts,
+                "title": title,
+                "hash": hash_,
+                "checks": checks or 0,
+                "changes": changes or 0,
+                "etag": etag,
+                "last_modified": last_modified,
+                "headers": session.conditional_headers(etag, last_modified),
+            })
+        return a
+
+    def store(self, feed, a, r, now):
+        # a like returned by due(), r like returned by feed.get(); returns True for a new revision
+        checks, changes, changed = a["checks"] + 1, a["changes"], False
+        etag, last_modified, hash_ = a["etag"], a["last_modified"], a["hash"]
+        ts = now.isoformat()[:19]
+        new_hash = content_hash(feed.adapter, r.text) if r.status_code == 200 else None
+        with metrics.timer("db write", feed.name), feed.conn:
+            if r.status_code == 200:
+                etag = r.headers.get("ETag") or etag
+                last_modified = r.headers.get("Last-Modified") or last_modified
+                if new_hash != hash_:
+                    html, html_ref = r.text, None
+                    if feed.html_store.enabled:
+                        html, html_ref = None, feed.html_store.put(r.text)
+                    feed.conn.execute(REVISION_SQL, (a["url"], ts, new_hash, html, html_ref))
+                    hash_, changes, changed = new_hash, changes + 1, True
+                    logging.info(f"changed: {a['ts']} –– {a['title']}")
+            elif r.status_code != 304:
+                logging.warning(f"revisit: HTTP {r.status_code} for {a['url']}")
+            next_ts = next_revisit(now, checks, self.first, self.factor).isoformat()[:19]
+            feed.conn.execute(REVISIT_SQL, (a["url"], etag, last_modified, hash_, checks, changes, next_ts))
+        metrics.count(feed.name, f"revisit {r.status_code}")
+        if changed:
+            metrics.count(feed.name, "revised")
+        return changed
+
+    def run(self, feeds, downloader=None):
+        """
+        Revisits the due articles of all feeds, interleaved like the backlog.
+        Returns {feed name: (revisits, changes)}.
+        """
+        now = datetime.now()
+        stats = {feed.name: (0, 0) for feed in feeds}
+        jobs = list()
+        try:
+            for feed in feeds:
+                feed._open_db()
+                due = self.due(feed, now)
+                logging.info(f"{feed.name}: {len(due)} articles to revisit")
+                jobs.append([(feed, a) for a in due])
+            downloader = downloader or Downloader(stage="revisit")
+            for feed, a, r in downloader.run(interleave(*jobs)):
+                changed = self.store(feed, a, r, datetime.now())
+                checks, changes = stats[feed.name]
+                stats[feed.name] = (checks + 1, changes + changed)
+        except KeyboardInterrupt:
+            logging.warning("KeyboardInterrupt: skipping the rest of the revisits")
+        finally:
+            for feed in feeds:
+                if feed.conn:
+                    feed._close_db()
+        for name, (checks, changes) in stats.items():
+            logging.info(f"{name}: {checks} articles revisited, {changes} changed")
+        return stats
+
+
+def revisit_all_feeds():
+    return Revisits().run(registry.registry().feeds())
+
+
+if __name__ == "__main__":
+    pass
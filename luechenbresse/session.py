@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+One pooled HTTP session for the whole process: keep-alive, compression, explicit timeouts.
+Configuration in luechenbresse.ini:
+[http]
+hosts = 10              number of hosts to keep connection pools for
+per_host = 4            connections kept open per host
+connect_timeout = 5     seconds
+read_timeout = 30       seconds
+
+Created: 18.10.26
+"""
+
+import threading
+
+from luechenbresse import ini
+
+_SESSION = None
+_LOCK = threading.Lock()
+
+
+def _accept_encoding():
+    # urllib3 only decodes br when one of the brotli packages is around
+    try:
+        import brotli
+        return "gzip, deflate, br"
+    except ImportError:
+        pass
+    try:
+        import brotlicffi
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+def session():
+    global _SESSION
+    with _LOCK:
+        if _SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=int(ini.get("http", "hosts", 10)),
+                pool_maxsize=int(ini.get("http", "per_host", 4)),
+                pool_block=True
+            )
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers["Accept-Encoding"] = _accept_encoding()
+            _SESSION = s
+        return _SESSION
+
+def timeout():
+    # (connect, read) as understood by requests
+    return float(ini.get("http", "connect_timeout", 5)), float(ini.get("http", "read_timeout", 30))
+
+def conditional_headers(etag, last_modified):
+    headers = dict()
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+def close():
+    global _SESSION
+    with _LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
+
+
+if __name__ == "__main__":
+    pass
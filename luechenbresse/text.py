@@ -8,16 +8,69 @@ transform them to a list of words without decorations and then work with such li
 
 _DECORATORS = '''+"'-.!?;:,|/“”()'''
 
+def _undecorated(s):
+    # str -> list of its undecorated words
+    return [w for w in (word.strip(_DECORATORS) for word in s.split(" ") if word != "") if w != ""]
+
+def words(*mixup):
+    # yield undecorated words one at a time, depth first
+    # uses an explicit stack, so deep nesting does not hit the recursion limit
+    # mixup: str | list(str) | tuple(str) | nested mixups -> str, str, ...
+    stack = [iter(mixup)]
+    while stack:
+        for x in stack[-1]:
+            if isinstance(x, str):
+                for word in x.split(" "):
+                    word = word.strip(_DECORATORS)
+                    if word != "":
+                        yield word
+            else:
+                assert isinstance(x, list) or isinstance(x, tuple), (x, type(x))
+                stack.append(iter(x))
+                break
+        else:
+            stack.pop()
+
+def strings(mixup):
+    # yield the strings of a nested mixup unchanged, depth first, like words() without recursion
+    if isinstance(mixup, str):
+        yield mixup
+        return
+    stack = [iter(mixup)]
+    while stack:
+        for x in stack[-1]:
+            if isinstance(x, str):
+                yield x
+            else:
+                assert isinstance(x, list) or isinstance(x, tuple), (x, type(x))
+                stack.append(iter(x))
+                break
+        else:
+            stack.pop()
+
 def undecorate(mixup):
     # get undecorated words
     # does not change the nesting, but adds a level everywhere
     # mixup: str | list(str) | nested mixups -> nested mixup one level deeper
-    if isinstance(mixup, list) or isinstance(mixup, tuple):
-        l = [undecorate(s) for s in mixup]
-    else:
-        assert isinstance(mixup, str), (mixup, type(mixup))
-        l = [word.strip(_DECORATORS) for word in mixup.split(" ") if word != ""]
-    return [e for e in l if e != ""]
+    if isinstance(mixup, str):
+        return _undecorated(mixup)
+    assert isinstance(mixup, list) or isinstance(mixup, tuple), (mixup, type(mixup))
+    root = list()
+    stack = [(iter(mixup), root)]
+    while stack:
+        it, l = stack[-1]
+        for x in it:
+            if isinstance(x, str):
+                l.append(_undecorated(x))
+            else:
+                assert isinstance(x, list) or isinstance(x, tuple), (x, type(x))
+                child = list()
+                l.append(child)
+                stack.append((iter(x), child))
+                break
+        else:
+            stack.pop()
+    return root
 
 def flatten(mixup):
     # make nested list of strings a flat list
@@ -25,27 +78,16 @@ def flatten(mixup):
     # mixup: nested mixup of lists of str -> list(str)
     if isinstance(mixup, str):
         return mixup
-    else:
-        assert isinstance(mixup, list) or isinstance(mixup, tuple), (mixup, type(mixup))
-        l = list()
-        for y in mixup:
-            f = flatten(y)
-            if isinstance(f, str):
-                l.append(f)
-            else:
-                l.extend(flatten(y))
-        return l
+    assert isinstance(mixup, list) or isinstance(mixup, tuple), (mixup, type(mixup))
+    return list(strings(mixup))
 
 def join(*args):
     # form one flat list of undecorated words from nested list(s) of strings
-    l = list()
-    for arg in args:
-        l.extend(flatten(undecorate(arg)))
-    return l
+    return list(words(*args))
 
 def sjoin(*args):
     # form one string of undecorated words from nested list(s) of strings
-    return " ".join(join(args))  # args is tuple, not list
+    return " ".join(words(*args))
 
 def context(words, i, j, width=5):
     """
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Incremental maintenance of words_by_week from the parsed table.
+words_counted remembers which parsed rows are in words_by_week already (and with which parser version and week).
+New rows are counted in memory per chunk and added with one bulk upsert per week.
+Rows parsed again or moved to another week make their weeks being rebuilt, all other weeks stay untouched.
+
+Created: 18.10.26
+"""
+
+from collections import Counter, defaultdict
+from time import perf_counter
+import logging
+
+from luechenbresse import ini
+from luechenbresse import registry
+
+UPSERT_SQL = """
+    INSERT INTO words_by_week(word, calweek, cnt_occ, cnt_art) VALUES (?, ?, ?, ?)
+        ON CONFLICT(word, calweek) DO UPDATE SET
+            cnt_occ = cnt_occ + excluded.cnt_occ,
+            cnt_art = cnt_art + excluded.cnt_art
+"""
+
+NEW_SQL = """
+    SELECT p.rowid, p.url, p.calweek, p.parser, p.plain
+    FROM parsed p LEFT JOIN words_counted c ON c.url = p.url
+    WHERE p.rowid > ? AND c.url IS NULL AND p.calweek IS NOT NULL
+    ORDER BY p.rowid
+    LIMIT ?
+"""
+
+WEEK_SQL = """
+    SELECT p.rowid, p.url, p.calweek, p.parser, p.plain
+    FROM parsed p
+    WHERE p.rowid > ? AND p.calweek = ?
+    ORDER BY p.rowid
+    LIMIT ?
+"""
+
+STALE_SQL = """
+    SELECT c.calweek, p.calweek
+    FROM words_counted c JOIN parsed p ON p.url = c.url
+    WHERE p.parser IS NOT c.parser OR p.calweek IS NOT c.calweek
+"""
+
+
+class WeekCounts:
+    """
+    Counts of a batch of parsed rows, per week.
+    """
+
+    def __init__(self):
+        self.occ = defaultdict(Counter)
+        self.art = defaultdict(Counter)
+        self.counted = list()
+
+    def add(self, url, calweek, parser, plain):
+        words = plain.split() if plain else []
+        self.occ[calweek].update(words)
+        self.art[calweek].update(set(words))
+        self.counted.append((url, calweek, parser))
+
+    def flush(self, conn):
+        # one transaction for the whole batch, so words_counted never lies
+        with conn:
+            for calweek, occ in self.occ.items():
+                art = self.art[calweek]
+                conn.executemany(UPSERT_SQL, [(word, calweek, n, art[word]) for word, n in occ.items()])
+            conn.executemany("""
+                INSERT INTO words_counted(url, calweek, parser) VALUES (?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET calweek = excluded.calweek, parser = excluded.parser
+            """, self.counted)
+        n = len(self.counted)
+        self.__init__()
+        return n
+
+
+def _count(conn, sql, args, chunk_size):
+    # keyset over parsed.rowid, args are the parameters between rowid and limit
+    last = 0
+    cnt = 0
+    cur = conn.cursor()
+    while True:
+        rows = cur.execute(sql, (last,) + args + (chunk_size,)).fetchmany(chunk_size)
+        if not rows:
+            break
+        last = rows[-1][0]
+        counts = WeekCounts()
+        for _, url, calweek, parser, plain in rows:
+            counts.add(url, calweek, parser, plain)
+        cnt += counts.flush(conn)
+    return cnt
+
+def rebuild_week(conn, calweek, chunk_size=None):
+    chunk_size = int(chunk_size or ini.get("wordcount", "chunk_size", 1000))
+    with conn:
+        conn.execute("DELETE FROM words_by_week WHERE calweek = ?", (calweek,))
+        conn.execute("DELETE FROM words_counted WHERE calweek = ?", (calweek,))
+    cnt = _count(conn, WEEK_SQL, (calweek,), chunk_size)
+    logging.info(f"rebuilt week {calweek} from {cnt} articles")
+    return cnt
+
+def stale_weeks(conn):
+    weeks = set()
+    for old, new in conn.execute(STALE_SQL):
+        weeks.add(old)
+        weeks.add(new)
+    weeks.discard(None)
+    return sorted(weeks)
+
+def update(conn, chunk_size=None):
+    """
+    Bring words_by_week up to date with parsed. Returns the number of articles counted.
+    """
+    chunk_size = int(chunk_size or ini.get("wordcount", "chunk_size", 1000))
+    cnt = 0
+    for calweek in stale_weeks(conn):
+        cnt += rebuild_week(conn, calweek, chunk_size)
+    cnt += _count(conn, NEW_SQL, (), chunk_size)
+    return cnt
+
+def count_all_feeds(calweek=None):
+    for feed in registry.registry().feeds():
+        feed._open_db()
+        try:
+            pc = perf_counter()
+            if calweek:
+                cnt = rebuild_week(feed.conn, calweek)
+            else:
+                cnt = update(feed.conn)
+            logging.info(f"{feed.name}: counted words of {cnt} articles in {perf_counter() - pc:0.1f}s")
+        finally:
+            feed._close_db()
+
+
+if __name__ == "__main__":
+    pass
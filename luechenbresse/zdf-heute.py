@@ -3,24 +3,20 @@
 
 """
 Special coding for the zdf-heute RSS feed.
-We can re-think the exit-mechanism later (class/interface, whatever...).
 
 Created: 09.05.20
 """
 
-from datetime import datetime
-from time import mktime
+from luechenbresse.adapter import FeedAdapter
 
-def parse_feed_header(feed_header):
-    return feed_header["title"], feed_header["published"]
 
-def parse_feed_entry(feed_entry):
-    url = feed_entry["link"]
-    rss_id = feed_entry["id"]
-    title = feed_entry["title"]
-    ts = datetime.fromtimestamp(mktime(feed_entry["published_parsed"])).isoformat()
-    return url, rss_id, title, ts
+class Adapter(FeedAdapter):
+
+    # increment when the selectors change, already parsed articles will be parsed again
+    PARSER_VERSION = 1
+    TITLE = ["h1 .big-headline", "h1"]
+    PARAGRAPHS = ["article .r-richtext p", "div.r-richtext p", "article p"]
 
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    pass
@@ -27,6 +27,7 @@ setuptools.setup(
     zip_safe = False,
     scripts = [ "bin/luechenbresse", "bin/lb-btci" ],
     install_requires = [ 'requests', 'feedparser', 'bs4', 'docopt', ],
+    extras_require = { 'export': [ 'pyarrow' ], },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
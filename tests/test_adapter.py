@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import time
+import types
+import pickle
+import unittest
+from luechenbresse import adapter
+
+ENTRIES = [
+    {"link": "https://example.com/1", "id": "1", "title": "Eins", "published_parsed": time.strptime("2020-05-09 10:00:00", "%Y-%m-%d %H:%M:%S")},
+    {"link": "", "id": "2", "title": "ohne URL", "published_parsed": None},
+]
+
+
+def parse_feed_header(feed_header):
+    return feed_header["title"], None
+
+def parse_feed_entry(e):
+    return e["link"], e["id"], e["title"].upper(), None
+
+def parse_article(html):
+    return [html, []], {}
+
+
+class EntryPoint:
+    value = "tests.test_adapter:Custom"
+
+    def load(self):
+        return Custom
+
+
+class Custom(adapter.FeedAdapter):
+    PARAGRAPHS = ["p.text"]
+
+
+class TestAdapter(unittest.TestCase):
+
+    def test_iso(self):
+        t = time.strptime("2020-05-09 08:07:06", "%Y-%m-%d %H:%M:%S")
+        self.assertEqual(adapter.iso(t), "2020-05-09T08:07:06")
+        self.assertIsNone(adapter.iso(None))
+
+    def test_iso_keeps_local_convention(self):
+        # feedparser structs have tm_isdst = 0, the old mktime conversion shifts summer times
+        t = time.struct_time((2020, 7, 1, 10, 0, 0, 2, 183, 0))
+        tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Europe/Berlin"
+        time.tzset()
+        try:
+            self.assertEqual(adapter.iso(t), "2020-07-01T11:00:00")
+        finally:
+            if tz is None:
+                del os.environ["TZ"]
+            else:
+                os.environ["TZ"] = tz
+            time.tzset()
+
+    def test_normalize(self):
+        entries = adapter.FeedAdapter().normalize(ENTRIES)
+        self.assertEqual(entries[0], adapter.Entry("https://example.com/1", "1", "Eins", "2020-05-09T10:00:00"))
+        self.assertEqual(entries[1].url, "")
+        self.assertEqual(entries[1].ts, None)
+
+    def test_feed_modules(self):
+        for name in ("zdf-heute", "ard-tagesschau"):
+            a = adapter.load(name, eps={})
+            self.assertIsInstance(a, adapter.FeedAdapter)
+            self.assertIsInstance(pickle.loads(pickle.dumps(a)), type(a))
+        self.assertEqual(adapter.load("ard-tagesschau", eps={}).parse_feed_header({"title": "t", "updated": "u"}),
+                         ("t", "u"))
+
+    def test_old_style_module(self):
+        a = adapter.load("x", "tests.test_adapter")
+        self.assertIsInstance(a, adapter.ModuleAdapter)
+        self.assertEqual(a.normalize(ENTRIES)[0].title, "EINS")
+        self.assertEqual(pickle.loads(pickle.dumps(a)).module.__name__, "tests.test_adapter")
+
+    def test_entry_point(self):
+        a = adapter.load("custom", eps={"custom": EntryPoint()})
+        self.assertIsInstance(a, Custom)
+
+    def test_no_adapter(self):
+        with self.assertRaises(ValueError):
+            adapter.adapter_from(types.SimpleNamespace(), "x")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from luechenbresse import db
+from luechenbresse import archive
+from luechenbresse.adapter import FeedAdapter
+from luechenbresse.download import Downloader
+from luechenbresse.feed import Feed
+
+PAGE = """<html><body><main>
+<a class="teaser-right__link" href="/inland/{day}-a.html">A vom {day}</a>
+<a class="teaser-right__link" href="/inland/{day}-b.html#comments">B vom {day}</a>
+<a class="teaser-right__link" href="https://www.example.com/ausland/immer-dabei.html">Immer dabei</a>
+</main></body></html>
+"""
+
+
+class ArchiveFixture(BaseHTTPRequestHandler):
+    # archive index pages, days listed in server.broken answer 500 once
+
+    def do_GET(self):
+        day = parse_qs(urlsplit(self.path).query)["datum"][0]
+        self.server.requests.append(day)
+        if day in self.server.broken:
+            self.server.broken.remove(day)
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = PAGE.format(day=day).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCrawl(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = HTTPServer(("127.0.0.1", 0), ArchiveFixture)
+        self.server.requests = list()
+        self.server.broken = ["2020-05-02"]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        class Adapter(FeedAdapter):
+            ARCHIVE_URL = f"http://127.0.0.1:{self.server.server_port}/archiv?datum={{day}}"
+            ARCHIVE_LINKS = ["a.teaser-right__link"]
+
+        self.db_file = Path(self.tmp.name) / "archive.sqlite"
+        self.feed = Feed("archive", "http://127.0.0.1/rss", "rss", self.db_file, ["db-core.sql"], adapter=Adapter())
+        self.downloader = Downloader(concurrency=2, rate=1000, burst=10)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        db.close(self.db_file)
+        self.tmp.cleanup()
+
+    def articles(self):
+        self.feed._open_db()
+        rows = self.feed.conn.execute("SELECT url, ts, realised_ts FROM articles ORDER BY url").fetchall()
+        self.feed._close_db()
+        return rows
+
+    def test_resumable_and_deduplicated(self):
+        pages, new = archive.crawl(self.feed, "2020-05-01", "2020-05-04", self.downloader)
+        # 2020-05-02 failed, the shared link is only inserted once
+        self.assertEqual((pages, new), (2, 5))
+        rows = self.articles()
+        self.assertIn((f"http://127.0.0.1:{self.server.server_port}/inland/2020-05-01-b.html",
+                       "2020-05-01T00:00:00", None), rows)
+        self.assertEqual(sum(1 for url, _, _ in rows if url.endswith("immer-dabei.html")), 1)
+
+        # only the failed day is requested again
+        self.server.requests.clear()
+        pages, new = archive.crawl(self.feed, "2020-05-01", "2020-05-04", self.downloader)
+        self.assertEqual(self.server.requests, ["2020-05-02"])
+        self.assertEqual((pages, new), (1, 2))
+        self.assertEqual(len(self.articles()), 7)
+
+    def test_no_archive(self):
+        self.feed.adapter = FeedAdapter()
+        with self.assertRaises(ValueError):
+            archive.crawl(self.feed, "2020-05-01", "2020-05-02")
+
+
+if __name__ == '__main__':
+    unittest.main()
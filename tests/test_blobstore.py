@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import sqlite3
+from luechenbresse import migrations
+from luechenbresse.blobstore import HtmlStore
+
+
+class TestHtmlStore(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        migrations.migrate(self.conn)
+        self.store = HtmlStore(self.conn, mode="blob", codec="zlib", level=6)
+
+    def test_has_reference_column(self):
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(articles)")]
+        self.assertIn("html_ref", columns)
+
+    def test_roundtrip(self):
+        html = "<html><body>Grüße aus Mainz</body></html>"
+        ref = self.store.put(html)
+        self.assertEqual(self.store.get(ref), html)
+
+    def test_deduplicates_identical_pages(self):
+        html = "<html>" + "x" * 10_000 + "</html>"
+        self.assertEqual(self.store.put(html), self.store.put(html))
+        cnt = self.conn.execute("SELECT count(*) FROM html_blobs").fetchone()[0]
+        self.assertEqual(cnt, 1)
+
+    def test_split_moves_html_out_of_the_row(self):
+        d = self.store.split({"html": "<p>A</p>"})
+        self.assertIsNone(d["html"])
+        self.assertEqual(self.store.resolve(d["html"], d["html_ref"]), "<p>A</p>")
+
+    def test_inline_mode_leaves_html_alone(self):
+        store = HtmlStore(self.conn, mode="inline", codec="zlib", level=6)
+        d = store.split({"html": "<p>A</p>"})
+        self.assertEqual(d["html"], "<p>A</p>")
+        self.assertIsNone(d["html_ref"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import signal
+import unittest
+import threading
+from time import sleep, monotonic
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from luechenbresse.daemon import poll_interval, Daemon
+from luechenbresse.download import Downloader
+
+NOW = datetime(2020, 5, 10, 12, 0, 0)
+
+
+class TestPollInterval(unittest.TestCase):
+
+    def test_no_articles(self):
+        self.assertEqual(poll_interval([], NOW, 300, 10800), 10800)
+
+    def test_busy_feed(self):
+        # 20 articles in the last 2 hours -> one every 6 minutes -> poll every 3 minutes, but not below 5
+        realised = ["2020-05-10T11:55:00"] * 19 + ["2020-05-10T10:00:00"]
+        self.assertEqual(poll_interval(realised, NOW, 300, 10800, 0.5), 300)
+
+    def test_quiet_feed(self):
+        # 4 articles in the last 8 hours -> every 2 hours -> poll every hour
+        realised = ["2020-05-10T11:00:00", "2020-05-10T08:00:00", "2020-05-10T06:00:00", "2020-05-10T04:00:00"]
+        self.assertEqual(poll_interval(realised, NOW, 300, 10800, 0.5), 3600)
+
+    def test_silent_feed(self):
+        realised = ["2020-05-01T11:00:00"] * 20
+        self.assertEqual(poll_interval(realised, NOW, 300, 10800, 0.5), 10800)
+
+
+class Response:
+    status_code = 200
+
+
+class StubDownloader:
+    # one job every delay seconds, like a rate limited host
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def run(self, jobs):
+        for owner, article in jobs:
+            sleep(self.delay)
+            yield owner, article, Response()
+
+
+class StubFeed:
+    # backlog of (URL, ts), every poll brings one new article, a retry may become due at retry_at
+
+    def __init__(self, name, n, retry_at=None, prefix=""):
+        self.name = name
+        self.prefix = prefix
+        self.backlog = [(f"{prefix}{name}/{k}", f"2020-05-01T00:00:{k:02d}") for k in range(n)]
+        self.retry_at = retry_at
+        self.conn = None
+        self.polls = 0
+        self.stored = list()
+
+    def _open_db(self):
+        self.conn = object()
+
+    def _close_db(self):
+        self.conn = None
+
+    def get_rss(self):
+        self.polls += 1
+        self.backlog.append((f"{self.prefix}{self.name}/poll-{self.polls}", f"2020-05-02T00:00:{self.polls:02d}"))
+        return {"new": 1, "known": 0}
+
+    def _get_backlog(self):
+        due = [(u, ts) for u, ts in self.backlog if u not in self.stored]
+        if self.retry_at and datetime.now() >= self.retry_at and "retry" not in self.stored:
+            due.append(("retry", "2020-04-01T00:00:00"))
+        return [{"url": u, "ts": ts, "title": u, "attempts": 0} for u, ts in due]
+
+    def _next_retry(self):
+        if self.retry_at and datetime.now() < self.retry_at:
+            return self.retry_at.isoformat()
+        return None
+
+    def _store_download(self, a, r, i, n):
+        self.stored.append(a["url"])
+
+
+class Slow(BaseHTTPRequestHandler):
+    # counts the requests served
+
+    def do_GET(self):
+        sleep(0.3)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+        self.server.served.append(self.path)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubDaemon(Daemon):
+
+    def interval(self, feed):
+        return 0.2
+
+
+class TestRun(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = signal.getsignal(signal.SIGTERM)
+
+    def run_until_sigterm(self, daemon, seconds):
+        timer = threading.Timer(seconds, os.kill, (os.getpid(), signal.SIGTERM))
+        timer.start()
+        pc = monotonic()
+        daemon.run()
+        timer.join()
+        return monotonic() - pc
+
+    def test_polls_while_downloading(self):
+        feeds = [StubFeed("a", 60), StubFeed("b", 60)]
+        daemon = StubDaemon(feeds, StubDownloader(0.02))
+        dt = self.run_until_sigterm(daemon, 1.0)
+        self.assertLess(dt, 1.5)
+        for feed in feeds:
+            # polled every 0.2 s although the backlog was never used up, articles found are downloaded
+            self.assertGreaterEqual(feed.polls, 3)
+            self.assertLess(len(feed.stored), 60)
+            self.assertIn(f"{feed.name}/poll-1", feed.stored)
+            self.assertEqual(len(set(feed.stored)), len(feed.stored))
+            self.assertIsNone(feed.conn)
+        self.assertEqual(signal.getsignal(signal.SIGTERM), self.handler)
+
+    def test_wakes_up_for_retries(self):
+        feed = StubFeed("a", 0, retry_at=datetime.now() + timedelta(seconds=0.3))
+        daemon = StubDaemon([feed], StubDownloader(0.0))
+        daemon.interval = lambda feed: 60
+        self.run_until_sigterm(daemon, 1.0)
+        self.assertIn("retry", feed.stored)
+        self.assertEqual(feed.polls, 1)
+
+    def test_stores_what_was_sent(self):
+        from luechenbresse import session
+        session.session()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Slow)
+        server.served = list()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            feed = StubFeed("a", 40, prefix=f"http://127.0.0.1:{server.server_port}/")
+            daemon = StubDaemon([feed])
+            # workers wait for tokens when SIGTERM comes, they must not send anything afterwards
+            daemon.downloader = Downloader(concurrency=4, rate=10, burst=1, stop=daemon.stop)
+            dt = self.run_until_sigterm(daemon, 0.75)
+            self.assertLess(dt, 1.5)
+            sleep(0.5)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertGreater(len(feed.stored), 2)
+        self.assertEqual(sorted("/" + u.split("/", 3)[3] for u in feed.stored), sorted(server.served))
+
+
+if __name__ == '__main__':
+    unittest.main()
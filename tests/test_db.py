@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import sqlite3
+import tempfile
+from pathlib import Path
+from luechenbresse import db
+
+
+class TestConnectionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = Path(self.tmp.name) / "test.sqlite"
+
+    def tearDown(self):
+        db.close_all()
+        self.tmp.cleanup()
+
+    def test_one_connection_per_database(self):
+        self.assertIs(db.connect(self.db_file), db.connect(str(self.db_file)))
+
+    def test_uses_wal(self):
+        conn = db.connect(self.db_file)
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_batch_commits_after_size(self):
+        conn = db.connect(self.db_file)
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        other = sqlite3.connect(self.db_file)
+        batch = db.Batch(conn, size=3, seconds=3600)
+        for x in range(2):
+            conn.execute("INSERT INTO t VALUES (?)", (x,))
+            batch.tick()
+        self.assertEqual(other.execute("SELECT count(*) FROM t").fetchone()[0], 0)
+        conn.execute("INSERT INTO t VALUES (2)")
+        batch.tick()
+        self.assertEqual(other.execute("SELECT count(*) FROM t").fetchone()[0], 3)
+        other.close()
+
+    def test_batch_commits_rest_on_exception(self):
+        conn = db.connect(self.db_file)
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        with self.assertRaises(KeyboardInterrupt):
+            with db.Batch(conn, size=100, seconds=3600) as batch:
+                conn.execute("INSERT INTO t VALUES (1)")
+                batch.tick()
+                raise KeyboardInterrupt()
+        db.close(self.db_file)
+        other = sqlite3.connect(self.db_file)
+        self.assertEqual(other.execute("SELECT count(*) FROM t").fetchone()[0], 1)
+        other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
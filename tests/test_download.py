@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import threading
+from time import monotonic, sleep
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from luechenbresse import download
+from luechenbresse.download import TokenBucket, Downloader, interleave
+
+
+class FakeClock:
+    # monotonic() and sleep() for TokenBucket, sleeping only moves the clock
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = list()
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Recorder(BaseHTTPRequestHandler):
+    # answers after server.delay seconds, remembers when each request came in
+
+    def do_GET(self):
+        self.server.arrivals.append(monotonic())
+        sleep(self.server.delay)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def start(delay=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Recorder)
+    server.arrivals, server.delay = list(), delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def jobs(server, n):
+    return [(server, {"url": f"http://127.0.0.1:{server.server_port}/{k}"}) for k in range(n)]
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_pacing(self):
+        clock = FakeClock()
+        with mock.patch.object(download, "monotonic", clock.monotonic), \
+                mock.patch.object(download, "sleep", clock.sleep):
+            bucket = TokenBucket(rate=2.0, capacity=1.0)
+            t0 = clock.now
+            for _ in range(5):
+                bucket.acquire()
+        # the first token is there, the others come every 0.5 s
+        self.assertAlmostEqual(clock.now - t0, 2.0)
+
+    def test_burst(self):
+        clock = FakeClock()
+        with mock.patch.object(download, "monotonic", clock.monotonic), \
+                mock.patch.object(download, "sleep", clock.sleep):
+            bucket = TokenBucket(rate=1.0, capacity=3.0)
+            for _ in range(3):
+                bucket.acquire()
+            self.assertEqual(clock.sleeps, [])
+            bucket.acquire()
+            self.assertAlmostEqual(sum(clock.sleeps), 1.0)
+
+
+class TestDownloader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # imports and session setup would delay the first request
+        from luechenbresse import session
+        import luechenbresse.feed
+        session.session()
+
+    def setUp(self):
+        self.servers = list()
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def start(self, delay=0.0):
+        server = start(delay)
+        self.servers.append(server)
+        return server
+
+    def test_rate_per_host(self):
+        a, b = self.start(), self.start()
+        downloader = Downloader(concurrency=4, rate=10, burst=1)
+        results = list(downloader.run(interleave(jobs(a, 5), jobs(b, 5))))
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(r.status_code == 200 for _, _, r in results))
+        for server in (a, b):
+            gaps = [t1 - t0 for t0, t1 in zip(server.arrivals, server.arrivals[1:])]
+            self.assertEqual(len(gaps), 4)
+            self.assertGreater(min(gaps), 0.08)
+        # the hosts do not wait for each other
+        self.assertLess(abs(a.arrivals[0] - b.arrivals[0]), 0.08)
+
+    def test_stopping_early_cancels_queued_jobs(self):
+        # the first job is done at once, the others hang until release is set, so jobs queue up
+        release, started = threading.Event(), list()
+
+        class Blocking(Downloader):
+            def fetch(self, url, headers=None):
+                started.append(url)
+                if url != "0":
+                    release.wait(5)
+                return url
+
+        pulled = list()
+
+        def generate():
+            for k in range(20):
+                pulled.append(k)
+                yield None, {"url": str(k)}
+
+        threading.Timer(0.3, release.set).start()
+        for _, article, r in Blocking(concurrency=2, rate=1000, burst=10).run(generate()):
+            self.assertEqual(r, "0")
+            break
+        # never more than 2 * concurrency pending, the queued ones were cancelled
+        self.assertEqual(len(pulled), 4)
+        # "2" may have been picked up by the free worker before the cancel
+        self.assertIn(sorted(started), (["0", "1"], ["0", "1", "2"]))
+
+
+class TestInterleave(unittest.TestCase):
+
+    def test_round_robin(self):
+        self.assertEqual(list(interleave([1, 2, 3], [], ["a"], [4, 5])), [1, "a", 4, 2, 5, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
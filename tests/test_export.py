@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import tempfile
+from pathlib import Path
+from luechenbresse import db
+from luechenbresse.adapter import FeedAdapter
+from luechenbresse.blobstore import HtmlStore
+from luechenbresse.feed import Feed
+
+try:
+    import pyarrow.parquet as pq
+    from luechenbresse import export
+except ImportError:
+    pq = None
+
+# ts, html; two calendar weeks and one article without ts, the third html inline, the others as blobs
+ARTICLES = [
+    ("2020-05-04T08:00:00", "<p>Montag</p>"),
+    ("2020-05-06T08:00:00", "<p>Mittwoch</p>"),
+    ("2020-05-11T08:00:00", "<p>Montag danach</p>"),
+    (None, "<p>ohne Datum</p>"),
+]
+
+
+@unittest.skipIf(pq is None, "needs pyarrow")
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name) / "out"
+        self.db_file = Path(self.tmp.name) / "export.sqlite"
+        self.feed = Feed("export", "http://127.0.0.1/rss", "rss", self.db_file, ["db-core.sql"],
+                         adapter=FeedAdapter())
+        self.feed._open_db()
+        store = HtmlStore(self.feed.conn, mode="blob")
+        with self.feed.conn:
+            for i, (ts, html) in enumerate(ARTICLES):
+                inline = i == 2
+                self.feed.conn.execute(
+                    "INSERT INTO articles(url, title, ts, dl_http, html, html_ref) VALUES (?, ?, ?, 200, ?, ?)",
+                    (f"http://example.com/{i}", f"T{i}", ts, html if inline else None,
+                     None if inline else store.put(html)))
+        self.feed._close_db()
+
+    def tearDown(self):
+        db.close(self.db_file)
+        self.tmp.cleanup()
+
+    def read(self, calweek):
+        return pq.read_table(self.out / "feed=export" / f"calweek={calweek}" / "part-0.parquet").to_pydict()
+
+    def partitions(self):
+        return sorted(p.name for p in (self.out / "feed=export").iterdir())
+
+    def test_partitions(self):
+        self.assertEqual(export.export_feed(self.feed, self.out, chunk_size=2), 4)
+        self.assertEqual(self.partitions(), ["calweek=2020.19", "calweek=2020.20", "calweek=unknown"])
+        week = self.read("2020.19")
+        self.assertEqual(week["url"], ["http://example.com/0", "http://example.com/1"])
+        self.assertEqual(week["calweek"], ["2020.19", "2020.19"])
+        self.assertNotIn("html", week)
+        self.assertEqual(self.read("unknown")["url"], ["http://example.com/3"])
+
+    def test_with_html(self):
+        export.export_feed(self.feed, self.out, columns=["url", "html"], with_html=True)
+        self.assertEqual(self.read("2020.19")["html"], ["<p>Montag</p>", "<p>Mittwoch</p>"])
+        self.assertEqual(self.read("2020.20")["html"], ["<p>Montag danach</p>"])
+
+    def test_html_needs_with_html(self):
+        export.export_feed(self.feed, self.out, columns=["url", "html"])
+        self.assertNotIn("html", self.read("2020.20"))
+
+    def test_date_range(self):
+        n = export.export_feed(self.feed, self.out, date_from="2020-05-06", date_to="2020-05-11")
+        self.assertEqual(n, 1)
+        self.assertEqual(self.partitions(), ["calweek=2020.19"])
+        self.assertEqual(self.read("2020.19")["url"], ["http://example.com/1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+from luechenbresse import extract
+
+
+class TestCalendar(unittest.TestCase):
+
+    def test_calweek(self):
+        self.assertEqual(extract.calweek("2020-05-09T12:34:56"), "2020.19")
+
+    def test_calweek_uses_iso_year(self):
+        self.assertEqual(extract.calweek("2021-01-01T08:00:00"), "2020.53")
+
+    def test_dow(self):
+        self.assertEqual(extract.dow("2020-05-09T12:34:56"), "Sa")
+        self.assertEqual(extract.dow("2020-05-11"), "Mo")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import tempfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from luechenbresse import db
+from luechenbresse.adapter import FeedAdapter
+from luechenbresse.feed import Feed
+
+ITEM = """<item><title>{title}</title>{link}<guid>{guid}</guid>
+<pubDate>{date} May 2020 10:00:00 +0000</pubDate></item>"""
+
+
+def rss(*items):
+    # items: (title, path of the link or "" for none, day of month)
+    body = "".join(ITEM.format(title=t, link=f"<link>https://example.com/{p}</link>" if p else "", guid=t, date=d)
+                   for t, p, d in items)
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Test</title>{body}</channel></rss>'.encode()
+
+
+class FeedFixture(BaseHTTPRequestHandler):
+    # serves server.body with server.etag, 304 when the client has it already
+
+    def do_GET(self):
+        self.server.requests.append((self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        if self.headers.get("If-None-Match") == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(self.server.body)))
+        self.send_header("ETag", self.server.etag)
+        self.send_header("Last-Modified", "Sun, 10 May 2020 10:00:00 GMT")
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGetRss(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = HTTPServer(("127.0.0.1", 0), FeedFixture)
+        self.server.requests, self.server.etag = list(), '"v1"'
+        # a duplicate and an entry without URL
+        self.server.body = rss(("A", "a", 9), ("B", "b", 8), ("A again", "a", 9), ("no URL", "", 7))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.db_file = Path(self.tmp.name) / "feed.sqlite"
+        self.feed = Feed("test", f"http://127.0.0.1:{self.server.server_port}/rss", "rss", self.db_file,
+                         ["db-core.sql"], adapter=FeedAdapter())
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        db.close(self.db_file)
+        self.tmp.cleanup()
+
+    def query(self, sql):
+        self.feed._open_db()
+        rows = self.feed.conn.execute(sql).fetchall()
+        self.feed._close_db()
+        return rows
+
+    def get_rss(self):
+        # -> stats, SQL statements run
+        statements = list()
+        self.feed._open_db()
+        self.feed.conn.set_trace_callback(statements.append)
+        try:
+            stats = self.feed.get_rss()
+        finally:
+            self.feed.conn.set_trace_callback(None)
+            self.feed._close_db()
+        return stats, statements
+
+    def test_new_known_and_not_modified(self):
+        stats, statements = self.get_rss()
+        self.assertEqual((stats["new"], stats["known"]), (2, 0))
+        self.assertEqual(self.query("SELECT url, title FROM articles ORDER BY url"),
+                         [("https://example.com/a", "A again"), ("https://example.com/b", "B")])
+        self.assertEqual(self.query("SELECT feed, etag, last_modified FROM feed_http"),
+                         [("test", '"v1"', "Sun, 10 May 2020 10:00:00 GMT")])
+        # one query for all known URLs, shared by the streaming parser and the dedup, one insert per new entry
+        self.assertEqual(sum(1 for s in statements if "WHERE url IN" in s), 1)
+        self.assertFalse(any("WHERE url = " in s for s in statements))
+        self.assertEqual(sum(1 for s in statements if "INSERT INTO articles" in s), 2)
+
+        # conditional GET, nothing parsed
+        stats, statements = self.get_rss()
+        self.assertEqual(self.server.requests[1], ('"v1"', "Sun, 10 May 2020 10:00:00 GMT"))
+        self.assertEqual((stats["new"], stats["known"]), (0, 0))
+        self.assertNotIn("parse", stats)
+        self.assertFalse(any("INSERT INTO articles" in s for s in statements))
+
+        # changed feed
+        self.server.etag = '"v2"'
+        self.server.body = rss(("C", "c", 10), ("A", "a", 9), ("B", "b", 8))
+        stats, statements = self.get_rss()
+        self.assertEqual((stats["new"], stats["known"]), (1, 2))
+        self.assertEqual(sum(1 for s in statements if "WHERE url IN" in s), 1)
+        self.assertEqual(sum(1 for s in statements if "INSERT INTO articles" in s), 1)
+        self.assertEqual(self.query("SELECT etag FROM feed_http"), [('"v2"',)])
+        self.assertEqual(len(self.query("SELECT url FROM articles")), 3)
+
+    def test_error_keeps_validators(self):
+        self.get_rss()
+        self.server.etag, self.server.body = '"v2"', b"<rss"
+        stats, _ = self.get_rss()
+        self.assertEqual(stats["new"], 0)
+        self.assertEqual(self.query("SELECT etag FROM feed_http"), [('"v1"',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+from luechenbresse import feedstream
+from luechenbresse.adapter import FeedAdapter
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>
+<title>tagesschau.de - die erste Adresse f&#252;r Nachrichten</title>
+<lastBuildDate>Sun, 10 May 2020 12:00:00 +0200</lastBuildDate>
+<item><title><![CDATA[Kim & Co]]></title><link>https://example.com/3.html</link><guid>g3</guid>
+    <pubDate>Sun, 10 May 2020 11:30:00 +0200</pubDate><description>lang</description></item>
+<item><title>Zwei</title><link>https://example.com/2.html</link><guid>g2</guid>
+    <pubDate>Sat, 09 May 2020 23:00:00 GMT</pubDate></item>
+<item><title>Eins</title><link>https://example.com/1.html</link><dc:date>2020-05-09T08:00:00Z</dc:date></item>
+</channel></rss>
+"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Atom</title><updated>2020-05-10T10:00:00Z</updated>
+<entry><title>A</title><link rel="self" href="https://example.com/self"/><link href="https://example.com/a.html"/>
+    <id>urn:a</id><published>2020-05-10T09:00:00+02:00</published></entry>
+<entry><title>B</title><link rel="alternate" href="https://example.com/b.html"/><id>urn:b</id>
+    <updated>2020-05-09T07:00:00Z</updated></entry>
+</feed>
+"""
+
+RDF = b"""<?xml version="1.0"?><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+    xmlns="http://purl.org/rss/1.0/"><channel><title>t</title></channel></rdf:RDF>"""
+
+
+class TestFeedStream(unittest.TestCase):
+
+    def normalized(self, header, entries):
+        a = FeedAdapter()
+        return a.parse_feed_header(header), a.normalize(entries)
+
+    def test_rss_like_feedparser(self):
+        import feedparser
+        f = feedparser.parse(RSS)
+        header, entries, stopped = feedstream.parse(RSS, chunk_size=100)
+        self.assertFalse(stopped)
+        self.assertEqual(header["title"], f["feed"]["title"])
+        self.assertEqual(self.normalized(header, entries)[1], self.normalized(f["feed"], f["entries"])[1])
+        self.assertEqual(tuple(entries[0]["published_parsed"])[:6], (2020, 5, 10, 9, 30, 0))
+        self.assertEqual(entries[0]["published_parsed"].tm_isdst, 0)
+
+    def test_atom_like_feedparser(self):
+        import feedparser
+        f = feedparser.parse(ATOM)
+        header, entries, _ = feedstream.parse(ATOM)
+        self.assertEqual(header["updated"], "2020-05-10T10:00:00Z")
+        self.assertEqual(self.normalized(header, entries)[1], self.normalized(f["feed"], f["entries"])[1])
+
+    def test_stops_at_known_urls(self):
+        known = {"https://example.com/3.html", "https://example.com/2.html"}
+        header, entries, stopped = feedstream.parse(RSS, known.intersection, stop_after_known=2)
+        self.assertTrue(stopped)
+        self.assertEqual(len(entries), 2)
+        header, entries, stopped = feedstream.parse(RSS, known.intersection, stop_after_known=3)
+        self.assertFalse(stopped)
+        self.assertEqual(len(entries), 3)
+        # one lookup per chunk of content
+        lookups = list()
+        feedstream.parse(RSS, lambda urls: lookups.append(urls) or known.intersection(urls), stop_after_known=3)
+        self.assertEqual(len(lookups), 1)
+
+    def test_unsupported(self):
+        with self.assertRaises(feedstream.Unsupported):
+            feedstream.parse(RDF)
+        with self.assertRaises(feedstream.ParseError):
+            feedstream.parse(b"<rss><channel><item></channel></rss>")
+
+
+if __name__ == '__main__':
+    unittest.main()
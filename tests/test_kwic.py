@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import sqlite3
+from luechenbresse import migrations
+from luechenbresse import kwic
+
+
+class TestKwic(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        migrations.migrate(self.conn)
+        self.parsed("a", "2020-05-01T10:00:00", "Nordkoreas Machthaber Kim Jong Un hat eine Waffe")
+        self.parsed("b", "2020-05-02T10:00:00", "Kim sagt nichts und Kim Jong Un schweigt")
+        kwic.update(self.conn)
+
+    def parsed(self, url, ts, plain, parser=1):
+        self.conn.execute("""
+            INSERT INTO parsed(url, ts, plain, parser) VALUES (?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET plain = excluded.plain, parser = excluded.parser
+        """, (url, ts, plain, parser))
+        self.conn.commit()
+
+    def test_single_word_is_case_insensitive(self):
+        hits = kwic.search(self.conn, "kim")
+        self.assertEqual([(h[0], h[2]) for h in hits], [("a", 2), ("b", 0), ("b", 4)])
+
+    def test_phrase(self):
+        hits = kwic.search(self.conn, "Kim Jong Un")
+        self.assertEqual([(h[0], h[2], h[3]) for h in hits], [("a", 2, 4), ("b", 4, 6)])
+
+    def test_contexts(self):
+        ctxs = kwic.contexts(self.conn, "Machthaber Kim", width=1)
+        self.assertEqual(ctxs[0][2], ("Nordkoreas Machthaber Kim Jong ...", 11))
+
+    def test_is_incremental(self):
+        self.assertEqual(kwic.update(self.conn), 0)
+        self.parsed("b", "2020-05-02T10:00:00", "Merkel schweigt", parser=2)
+        self.assertEqual(kwic.update(self.conn), 1)
+        self.assertEqual([h[0] for h in kwic.search(self.conn, "Kim")], ["a"])
+        self.assertEqual([h[0] for h in kwic.search(self.conn, "merkel")], ["b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import mock
+from luechenbresse import db
+from luechenbresse import migrations
+from luechenbresse import legacy
+from luechenbresse.adapter import FeedAdapter
+from luechenbresse.feed import Feed, FeedAPI
+
+SELECT_SQL = """
+    SELECT link AS url, id AS rss_id, title, ts, NULL AS realised_ts,
+        dl_ts, http AS dl_http, dt AS dl_dt, html
+    FROM old_articles
+"""
+
+
+class TestBulkImport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.legacy_db = Path(self.tmp.name) / "legacy.sqlite"
+        self.target_db = Path(self.tmp.name) / "target.sqlite"
+        conn = sqlite3.connect(self.legacy_db)
+        conn.execute("""
+            CREATE TABLE old_articles (link TEXT PRIMARY KEY, id TEXT, title TEXT, ts TEXT,
+                dl_ts TEXT, http INT, dt REAL, html TEXT)
+        """)
+        conn.executemany("INSERT INTO old_articles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+            # five articles per day
+            (f"https://example.com/{k:03d}", str(k), f"T{k}", f"2020-05-0{k // 5 + 1}T10:00:00", None, 200, 0.1,
+             "<p/>")
+            for k in range(25)
+        ])
+        conn.commit()
+        conn.close()
+        conn = sqlite3.connect(self.target_db)
+        migrations.migrate(conn)
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def target_count(self):
+        conn = sqlite3.connect(self.target_db)
+        n = conn.execute("SELECT count(*) FROM articles WHERE realised_ts IS NOT NULL").fetchone()[0]
+        conn.close()
+        return n
+
+    def test_imports_everything_in_batches(self):
+        read, inserted = legacy.bulk_import(self.legacy_db, self.target_db, SELECT_SQL, "test", batch_size=10)
+        self.assertEqual((read, inserted), (25, 25))
+        self.assertEqual(self.target_count(), 25)
+
+    def test_resumes_after_checkpoint(self):
+        legacy.bulk_import(self.legacy_db, self.target_db, SELECT_SQL, "test", batch_size=10, max_batches=1)
+        self.assertEqual(self.target_count(), 10)
+        read, inserted = legacy.bulk_import(self.legacy_db, self.target_db, SELECT_SQL, "test", batch_size=10)
+        self.assertEqual((read, inserted), (15, 15))
+        conn = sqlite3.connect(self.target_db)
+        self.assertEqual(legacy.get_checkpoint(conn, "test"), ("https://example.com/024", 25))
+        conn.close()
+
+    def test_batch_size_matching_exactly(self):
+        read, _ = legacy.bulk_import(self.legacy_db, self.target_db, SELECT_SQL, "test", batch_size=25)
+        self.assertEqual(read, 25)
+        read, _ = legacy.bulk_import(self.legacy_db, self.target_db, SELECT_SQL, "test", batch_size=25)
+        self.assertEqual(read, 0)
+
+    def test_trailing_semicolon(self):
+        read, _ = legacy.bulk_import(self.legacy_db, self.target_db, SELECT_SQL + "    ;\n", "test")
+        self.assertEqual(read, 25)
+
+
+class TestRowImport(TestBulkImport):
+
+    def setUp(self):
+        super().setUp()
+        feed = Feed("test", "http://127.0.0.1/rss", "rss", self.target_db, ["db-core.sql"], adapter=FeedAdapter())
+        with mock.patch.object(Feed, "from_name", return_value=feed):
+            self.api = FeedAPI("test")
+        self.api.open()
+
+    def tearDown(self):
+        self.api.close()
+        db.close(self.target_db)
+        super().tearDown()
+
+    def target_count(self):
+        return self.api.feed.conn.execute("SELECT count(*) FROM articles").fetchone()[0]
+
+    def test_imports_everything_in_batches(self):
+        read, inserted = legacy.row_import(self.legacy_db, self.api, SELECT_SQL + ";", "test", batch_size=10)
+        self.assertEqual((read, inserted), (25, 25))
+
+    def test_resumes_after_checkpoint(self):
+        # ts is not unique: the 2 rows of the second day in the first batch wait for the next one
+        legacy.row_import(self.legacy_db, self.api, SELECT_SQL, "test", key="ts", batch_size=7, max_batches=1)
+        self.assertEqual(self.target_count(), 5)
+        self.assertEqual(legacy.get_checkpoint(self.api.feed.conn, "test"), ("2020-05-01T10:00:00", 5))
+        read, inserted = legacy.row_import(self.legacy_db, self.api, SELECT_SQL, "test", key="ts", batch_size=7)
+        self.assertEqual((read, inserted), (20, 20))
+        self.assertEqual(self.target_count(), 25)
+        self.assertEqual(legacy.get_checkpoint(self.api.feed.conn, "test"), ("2020-05-05T10:00:00", 25))
+
+    def test_batch_size_matching_exactly(self):
+        read, _ = legacy.row_import(self.legacy_db, self.api, SELECT_SQL, "test", batch_size=25)
+        self.assertEqual(read, 25)
+        read, _ = legacy.row_import(self.legacy_db, self.api, SELECT_SQL, "test", batch_size=25)
+        self.assertEqual(read, 0)
+
+    def test_trailing_semicolon(self):
+        read, _ = legacy.row_import(self.legacy_db, self.api, SELECT_SQL + "    ;\n", "test")
+        self.assertEqual(read, 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
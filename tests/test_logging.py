@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import sys
+import unittest
+import tempfile
+import subprocess
+from pathlib import Path
+
+# runs in a fresh interpreter, LogManager configures the root logger for good
+SCRIPT = """
+import logging
+from pathlib import Path
+from luechenbresse import report
+from luechenbresse.adapter import FeedAdapter
+from luechenbresse.dotfolder import LogManager
+from luechenbresse.feed import Feed
+from luechenbresse.parse import parse_feed
+
+class Broken(FeedAdapter):
+    def parse_article(self, html):
+        raise ValueError("kaputt")
+
+def send(log_file, subject):
+    # what would be mailed, one file per report
+    n = len(list(log_file.parent.glob("sent-*.log")))
+    log_file.with_name(f"sent-{{n}}.log").write_text(log_file.read_text())
+
+if __name__ == "__main__":
+    report.send = send
+    LogManager()
+    feed = Feed("broken", "http://127.0.0.1/rss", "rss", Path({db!r}), ["db-core.sql"], adapter=Broken())
+    feed._open_db()
+    with feed.conn:
+        feed.conn.execute("INSERT INTO articles(url, ts, dl_http, html) VALUES ('http://example.com/a', "
+                          "'2020-05-04T08:00:00', 200, '<p>A</p>')")
+    feed._close_db()
+    parse_feed(feed, workers={workers})
+    if {rotate}:
+        LogManager().rotate("first report")
+    logging.info("last words")
+    LogManager().mail()
+"""
+
+
+class TestQueueLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dotfolder = Path(self.tmp.name) / ".luechenbresse"
+        self.dotfolder.mkdir()
+        (self.dotfolder / "luechenbresse.ini").write_text("[logging]\nconsole = OFF\nqueue = yes\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def mailed(self, workers, rotate=False):
+        script = Path(self.tmp.name) / "run.py"
+        script.write_text(SCRIPT.format(db=str(Path(self.tmp.name) / "broken.sqlite"), workers=workers,
+                                        rotate=rotate))
+        env = dict(os.environ, HOME=self.tmp.name)
+        subprocess.run([sys.executable, str(script)], env=env, check=True, capture_output=True)
+        return [p.read_text() for p in sorted(self.dotfolder.glob("sent-*.log"))]
+
+    def check(self, log):
+        # everything up to mail() is in the report, formatted once
+        self.assertIn("[INFO] last words", log)
+        self.assertIn("[ERROR] cannot parse http://example.com/a", log)
+        self.assertIn("ValueError: kaputt", log)
+        self.assertNotIn("INFO:root:", log)
+
+    def test_in_process(self):
+        self.check(self.mailed(1)[0])
+
+    def test_worker_errors(self):
+        self.check(self.mailed(2)[0])
+
+    def test_rotate(self):
+        first, last = self.mailed(1, rotate=True)
+        self.assertIn("ValueError: kaputt", first)
+        self.assertNotIn("last words", first)
+        # current.log started afresh
+        self.assertIn("[INFO] last words", last)
+        self.assertNotIn("ValueError: kaputt", last)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from luechenbresse import matcher
+from luechenbresse import migrations
+from luechenbresse import text
+
+
+class TestMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.m = matcher.Matcher(["Kim", "Kim Jong Un", "AfD", "Die Grünen"], ["und", "die", "der"])
+
+    def test_finds_single_and_multi_word_terms(self):
+        words = text.join("Machthaber Kim Jong Un und die AfD.")
+        self.assertEqual(list(self.m.find(words)), [("Kim", 1, 1), ("Kim Jong Un", 1, 3), ("AfD", 6, 6)])
+
+    def test_ignores_case(self):
+        self.assertEqual(list(self.m.find(["die", "grünen"])), [("Die Grünen", 0, 1)])
+
+    def test_partial_multi_word_term_is_no_match(self):
+        self.assertEqual(self.m.count("Kim Jong Il".split()), {"Kim": 1})
+
+    def test_counts(self):
+        self.assertEqual(self.m.count("Kim und Kim Jong Un".split()), {"Kim": 2, "Kim Jong Un": 1})
+
+    def test_stop_words(self):
+        self.assertTrue(self.m.is_stop_word("Der"))
+        self.assertEqual(list(self.m.without_stop_words("Die Partei und der Vorstand".split())), ["Partei", "Vorstand"])
+
+
+class TestNamesByWeek(unittest.TestCase):
+
+    def test_counts_per_week(self):
+        conn = sqlite3.connect(":memory:")
+        migrations.migrate(conn)
+        conn.executemany("INSERT INTO parsed(url, ts, plain, calweek) VALUES (?, ?, ?, ?)", [
+            ("a", "2020-05-04T10:00:00", "Kim und Kim Jong Un", "2020.19"),
+            ("b", "2020-05-05T10:00:00", "die AfD und Kim", "2020.19"),
+            ("c", "2020-05-11T10:00:00", "Die Grünen", "2020.20"),
+            ("d", "2020-05-11T11:00:00", None, "2020.20"),
+        ])
+        m = matcher.Matcher(["Kim", "Kim Jong Un", "AfD", "Die Grünen"])
+        occurrences, articles = matcher.names_by_week(conn, m)
+        self.assertEqual(occurrences["2020.19"], {"Kim": 3, "Kim Jong Un": 1, "AfD": 1})
+        self.assertEqual(articles["2020.19"], {"Kim": 2, "Kim Jong Un": 1, "AfD": 1})
+        occurrences, _ = matcher.names_by_week(conn, m, "2020-05-10")
+        self.assertEqual(occurrences, {"2020.20": {"Die Grünen": 1}})
+
+
+class TestCompiled(unittest.TestCase):
+
+    def test_is_cached(self):
+        with tempfile.TemporaryDirectory() as home:
+            with mock.patch.dict(os.environ, {"HOME": home}):
+                m1 = matcher.compiled()
+                self.assertTrue(matcher._cache_file().exists())
+                with mock.patch.object(matcher, "read_list") as read_list:
+                    m2 = matcher.compiled()
+                    read_list.assert_not_called()
+                self.assertEqual(m1.trie, m2.trie)
+
+    def test_rebuilds_when_data_changes(self):
+        with tempfile.TemporaryDirectory() as home:
+            with mock.patch.dict(os.environ, {"HOME": home}):
+                matcher.compiled()
+                with mock.patch.object(matcher, "_key", return_value="changed"):
+                    with mock.patch.object(matcher, "read_list", wraps=matcher.read_list) as read_list:
+                        matcher.compiled()
+                        self.assertEqual(read_list.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
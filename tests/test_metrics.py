@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import io
+import contextlib
+import unittest
+import tempfile
+from unittest import mock
+from pathlib import Path
+from luechenbresse import metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.reset()
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(metrics.percentile(values, 50), 50)
+        self.assertEqual(metrics.percentile(values, 95), 95)
+        self.assertEqual(metrics.percentile(values, 99), 99)
+        self.assertEqual(metrics.percentile([7], 99), 7)
+        self.assertIsNone(metrics.percentile([], 50))
+
+    def test_summary_per_stage_and_host(self):
+        for ms in (1, 2, 3, 400):
+            metrics.record("download", ms / 1000.0, "www.tagesschau.de")
+        metrics.record("download", 0.5, "www.heute.de")
+        with metrics.timer("commit"):
+            pass
+        s = {(x["stage"], x["host"]): x for x in metrics.summary()}
+        self.assertEqual(set(s), {("download", "www.tagesschau.de"), ("download", "www.heute.de"), ("commit", "")})
+        d = s[("download", "www.tagesschau.de")]
+        self.assertEqual(d["n"], 4)
+        self.assertAlmostEqual(d["p50"], 0.002)
+        self.assertAlmostEqual(d["p99"], 0.4)
+        self.assertEqual(sum(d["hist"]), 4)
+
+    def test_write_and_read_runs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "metrics.jsonl"
+            metrics.record("download", 0.1, "a")
+            metrics.write("--get_all", path)
+            metrics.reset()
+            metrics.write("--get_all", path)  # nothing recorded, nothing written
+            metrics.record("download", 0.2, "a")
+            metrics.write("--get_all", path)
+            runs = metrics.read(path)
+            self.assertEqual(len(runs), 2)
+            self.assertEqual(runs[1]["stages"][0]["sum"], 0.2)
+
+    def test_throughput_from_wall_time(self):
+        # 4 concurrent downloads of 1 s each in a run of 2 s: 2 per second, not 1
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "metrics.jsonl"
+            for _ in range(4):
+                metrics.record("download", 1.0, "a")
+            with mock.patch.object(metrics, "wall_time", return_value=2.0):
+                metrics.write("--get_all", path)
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                metrics.report(path)
+            self.assertEqual(out.getvalue().splitlines()[-1].split()[-1], "2.00")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import sqlite3
+from unittest import mock
+from luechenbresse import data
+from luechenbresse import migrations
+from luechenbresse.feed import BACKLOG_SQL
+
+
+class TestMigrations(unittest.TestCase):
+
+    def test_creates_fresh_database(self):
+        conn = sqlite3.connect(":memory:")
+        v = migrations.migrate(conn)
+        self.assertEqual(v, migrations.MIGRATIONS["db-core.sql"][-1][0])
+        self.assertEqual(migrations.version(conn), v)
+
+    def test_upgrades_unversioned_database(self):
+        # databases created before migrations existed carry user_version 0
+        conn = sqlite3.connect(":memory:")
+        conn.executescript(data.schema("db-core.sql"))
+        conn.execute("INSERT INTO articles(url, title) VALUES ('u', 't')")
+        conn.commit()
+        migrations.migrate(conn)
+        self.assertEqual(conn.execute("SELECT title FROM articles").fetchone()[0], "t")
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(articles)")]
+        self.assertIn("html_ref", columns)
+
+    def test_stops_at_target(self):
+        conn = sqlite3.connect(":memory:")
+        self.assertEqual(migrations.migrate(conn, target=1), 1)
+        self.assertEqual(migrations.migrate(conn), migrations.MIGRATIONS["db-core.sql"][-1][0])
+
+    def test_backlog_query_uses_partial_index(self):
+        conn = sqlite3.connect(":memory:")
+        migrations.migrate(conn)
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + BACKLOG_SQL, ("2020-05-10T12:00:00",)))
+        self.assertIn("articles_backlog", plan)
+
+    def check_failing_step(self, step):
+        conn = sqlite3.connect(":memory:")
+        steps = {"test.sql": [(1, "CREATE TABLE a (x);"), (2, step)]}
+        with mock.patch.dict(migrations.MIGRATIONS, steps):
+            with self.assertRaises(sqlite3.OperationalError):
+                migrations.migrate(conn, "test.sql")
+        # neither table b nor version 2
+        self.assertEqual(migrations.version(conn), 1)
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        self.assertEqual(tables, ["a"])
+
+    def test_failing_sql_step(self):
+        self.check_failing_step("CREATE TABLE b (x); INSERT INTO nowhere VALUES (1);")
+
+    def test_failing_callable_step(self):
+        def step(conn):
+            conn.execute("CREATE TABLE b (x)")
+            conn.execute("INSERT INTO nowhere VALUES (1)")
+        self.check_failing_step(step)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import sys
+import json
+import unittest
+import tempfile
+from pathlib import Path
+from luechenbresse import db
+from luechenbresse import parse
+from luechenbresse.adapter import FeedAdapter, ModuleAdapter
+from luechenbresse.feed import Feed
+
+PAGE = "<html><body><h1>Titel {k}</h1><article><p>Absatz {k}.</p></article></body></html>"
+
+
+# this module doubles as old style feed module for ModuleAdapter
+PARSER_VERSION = 1
+
+def parse_feed_header(feed_header):
+    return feed_header["title"], None
+
+def parse_feed_entry(e):
+    return e["link"], e["id"], e["title"], None
+
+def parse_article(html):
+    return [html.upper(), []], {}
+
+
+class Selectors(FeedAdapter):
+    TITLE = ["h1"]
+    PARAGRAPHS = ["article p"]
+
+
+class ParseFeedTests:
+    # run with one and with two workers, see below
+
+    workers = 1
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = Path(self.tmp.name) / "parse.sqlite"
+        self.feed = Feed("parse", "http://127.0.0.1/rss", "rss", self.db_file, ["db-core.sql"], adapter=Selectors())
+        self.feed._open_db()
+        with self.feed.conn:
+            for k in range(5):
+                self.feed.conn.execute(
+                    "INSERT INTO articles(url, ts, dl_http, html) VALUES (?, ?, ?, ?)",
+                    (f"http://example.com/{k}", f"2020-05-0{k + 1}T10:00:00", 404 if k == 4 else 200,
+                     PAGE.format(k=k)))
+        self.feed._close_db()
+
+    def tearDown(self):
+        db.close(self.db_file)
+        self.tmp.cleanup()
+
+    def parse(self):
+        return parse.parse_feed(self.feed, chunk_size=2, workers=self.workers)
+
+    def parsed(self):
+        self.feed._open_db()
+        rows = self.feed.conn.execute("SELECT url, text_json, plain, calweek, dow, parser FROM parsed ORDER BY url")
+        rows = rows.fetchall()
+        self.feed._close_db()
+        return rows
+
+    def test_only_pending_articles(self):
+        self.assertEqual(self.parse(), 4)
+        rows = self.parsed()
+        self.assertEqual([r[0] for r in rows], [f"http://example.com/{k}" for k in range(4)])
+        self.assertEqual(json.loads(rows[0][1]), ["Titel 0", ["Absatz 0."]])
+        self.assertEqual(rows[0][2:], ("Titel 0 Absatz 0", "2020.18", "Fr", 1))
+        self.assertEqual(self.parse(), 0)
+
+    def test_new_parser_version(self):
+        self.parse()
+        self.feed.adapter.PARSER_VERSION = 2
+        self.feed._open_db()
+        with self.feed.conn:
+            self.feed.conn.execute("UPDATE articles SET html = ? WHERE url = 'http://example.com/0'",
+                                   (PAGE.format(k="neu"),))
+        self.feed._close_db()
+        self.assertEqual(self.parse(), 4)
+        rows = self.parsed()
+        # updated in place
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({r[5] for r in rows}, {2})
+        self.assertEqual(rows[0][2], "Titel neu Absatz neu")
+
+    def test_module_adapter(self):
+        self.feed.adapter = ModuleAdapter(sys.modules[__name__])
+        self.assertEqual(self.parse(), 4)
+        self.assertEqual(json.loads(self.parsed()[1][1])[0], PAGE.format(k=1).upper())
+
+
+class TestParseFeed(ParseFeedTests, unittest.TestCase):
+    workers = 1
+
+
+class TestParseFeedPool(ParseFeedTests, unittest.TestCase):
+    workers = 2
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import tempfile
+from pathlib import Path
+from luechenbresse import data
+from luechenbresse import registry
+
+
+class TestMerged(unittest.TestCase):
+
+    def test_packaged_only(self):
+        definitions = registry.merged(data.feeds(), {})
+        self.assertEqual(set(definitions), {"zdf-heute", "ard-tagesschau"})
+        registry.validate(definitions)
+
+    def test_ini_overrides_and_adds(self):
+        definitions = registry.merged(data.feeds(), {
+            "feed:zdf-heute": {"feed": "https://www.zdf.de/rss/zdf/nachrichten"},
+            "feed:ard-tagesschau": {"enabled": "no"},
+            "feed:eigener": {"type": "rss", "feed": "https://example.com/rss", "db": "eigener.sqlite",
+                             "schema": "db-core.sql", "module": "luechenbresse.zdf-heute"},
+        })
+        self.assertEqual(set(definitions), {"zdf-heute", "eigener"})
+        self.assertEqual(definitions["zdf-heute"]["feed"], "https://www.zdf.de/rss/zdf/nachrichten")
+        self.assertEqual(definitions["zdf-heute"]["db"], "zdf-heute.sqlite")
+        self.assertEqual(definitions["eigener"]["schema"], ["db-core.sql"])
+        registry.validate(definitions)
+        # the packaged definitions stay as they are
+        self.assertEqual(data.feeds()["zdf-heute"]["feed"], "http://www.heute.de/zdfheute/rss")
+
+    def test_invalid(self):
+        definitions = registry.merged(data.feeds(), {
+            "feed:a": {"type": "atom", "feed": "ftp://example.com/rss", "db": "zdf-heute.sqlite", "schema": "x.sql"},
+            "feed:b": {"type": "rss"},
+        })
+        with self.assertRaises(ValueError) as cm:
+            registry.validate(definitions)
+        message = str(cm.exception)
+        for problem in ("unknown type atom", "no http(s) URL", "unknown schema x.sql", "is used by zdf-heute",
+                        "b: missing feed, db, schema"):
+            self.assertIn(problem, message)
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = registry.Registry(registry.merged(data.feeds(), {}), self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_feed_instances_are_reused(self):
+        feed = self.registry.feed("zdf-heute")
+        self.assertIs(self.registry.feed("zdf-heute"), feed)
+        self.assertEqual(feed.db, Path(self.tmp.name) / "zdf-heute.sqlite")
+        self.assertIs(feed.adapter, self.registry.adapters["zdf-heute"])
+        self.assertEqual([f.name for f in self.registry.feeds()], self.registry.names())
+
+    def test_no_db_folder(self):
+        r = registry.Registry(registry.merged(data.feeds(), {}))
+        with self.assertRaises(ValueError):
+            r.feed("zdf-heute")
+
+    def test_adapter_checked(self):
+        with self.assertRaises(ValueError):
+            registry.load_adapter("x", "luechenbresse.text")
+
+
+if __name__ == '__main__':
+    unittest.main()
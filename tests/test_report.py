@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import gzip
+import json
+import random
+import unittest
+import tempfile
+import threading
+import configparser
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from luechenbresse import ini
+from luechenbresse import report
+from luechenbresse.mailgun import Mailgun
+
+LOG = """2020-05-10 10:00:00,001 [INFO] Willkommen bei der Luechenbresse.
+2020-05-10 10:00:01,002 [WARNING] cannot GET zdf-heute, skipping
+2020-05-10 10:00:02,003 [ERROR] Sorry.
+Traceback (most recent call last):
+  File "x.py", line 1, in <module>
+ValueError: kaputt
+2020-05-10 10:00:03,004 [INFO] Ciao.
+"""
+
+
+class StubMailgun(BaseHTTPRequestHandler):
+    # answers with the status of the server, remembers what was posted
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.posts.append(body)
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestExcerpts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_file = Path(self.tmp.name) / "current.log"
+        self.log_file.write_text(LOG)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_warnings_and_errors_with_traceback(self):
+        cnt, excerpts = report.error_excerpts(self.log_file)
+        self.assertEqual(cnt, 2)
+        self.assertIn("skipping", excerpts[0])
+        self.assertTrue(excerpts[1].endswith("ValueError: kaputt"))
+        self.assertNotIn("Ciao", excerpts[1])
+
+    def test_max_errors(self):
+        cnt, excerpts = report.error_excerpts(self.log_file, max_errors=1)
+        self.assertEqual((cnt, len(excerpts)), (2, 1))
+        self.assertIn("... and 1 more", report.summary(self.log_file, max_errors=1))
+
+
+class TestCompressedLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_file = Path(self.tmp.name) / "current.log"
+        rnd = random.Random(4711)
+        with self.log_file.open("w") as f:
+            for k in range(20000):
+                f.write(f"2020-05-10 10:00:00,000 [INFO] line {k} {rnd.random()}\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fits(self):
+        data = report.compressed_log(self.log_file, 10_000_000)
+        self.assertEqual(gzip.decompress(data), self.log_file.read_bytes())
+
+    def test_cut_to_max_size(self):
+        data = report.compressed_log(self.log_file, 50_000)
+        self.assertLessEqual(len(data), 50_000)
+        text = gzip.decompress(data).decode()
+        self.assertTrue(text.startswith("[... first "))
+        self.assertTrue(text.endswith("line 19999 " + self.log_file.read_text().split(" ")[-1]))
+
+
+class TestDeliver(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool = Path(self.tmp.name) / "spool"
+        self.server = HTTPServer(("127.0.0.1", 0), StubMailgun)
+        self.server.posts = list()
+        self.server.status = 200
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        config = configparser.ConfigParser()
+        config.read_dict({"mailgun": {
+            "url": f"http://127.0.0.1:{self.server.server_port}/v3/example.com/messages",
+            "auth-key": "key", "from": "lb@example.com", "to": "me@example.com"
+        }})
+        self.saved_config, ini._CONFIG = ini._CONFIG, config
+        Mailgun.instance = None
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        ini._CONFIG = self.saved_config
+        Mailgun.instance = None
+        self.tmp.cleanup()
+
+    def test_delivered_and_removed(self):
+        report.spool("Betreff", "Text", [("current.log.gz", gzip.compress(b"log"))], folder=self.spool)
+        self.assertEqual(report.deliver(self.spool, retries=1), 1)
+        self.assertEqual(len(self.server.posts), 1)
+        self.assertIn(b"Betreff", self.server.posts[0])
+        self.assertIn(b'filename="current.log.gz"', self.server.posts[0])
+        self.assertEqual([p for p in self.spool.iterdir() if not p.name.startswith(".")], [])
+
+    def test_retried_and_kept(self):
+        self.server.status = 503
+        entry = report.spool("Betreff", "Text", folder=self.spool)
+        self.assertEqual(report.deliver(self.spool, retries=2, wait=0.01), 0)
+        self.assertEqual(len(self.server.posts), 2)
+        self.assertEqual(json.loads((entry / "mail.json").read_text())["subject"], "Betreff")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import sqlite3
+from datetime import datetime, timedelta
+from luechenbresse import retry
+from luechenbresse import migrations
+from luechenbresse.feed import BACKLOG_SQL, FakeResponse
+
+NOW = datetime(2020, 5, 10, 12, 0, 0)
+POLICY = retry.Policy(base=600, max_delay=172800, max_attempts=4, permanent_base=86400, permanent_attempts=2)
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class TestNextAttempt(unittest.TestCase):
+
+    def test_transient_backoff_capped(self):
+        delays = [retry.next_attempt(503, k, NOW, POLICY)[0] - NOW for k in (1, 2, 3)]
+        self.assertEqual(delays, [timedelta(seconds=600), timedelta(seconds=1200), timedelta(seconds=2400)])
+        policy = retry.Policy(base=600, max_delay=1000, max_attempts=10)
+        self.assertEqual(retry.next_attempt(999, 5, NOW, policy)[0] - NOW, timedelta(seconds=1000))
+
+    def test_parked(self):
+        self.assertEqual(retry.next_attempt(503, 4, NOW, POLICY), (None, True))
+        self.assertEqual(retry.next_attempt(404, 1, NOW, POLICY), (NOW + timedelta(days=1), False))
+        self.assertEqual(retry.next_attempt(410, 2, NOW, POLICY), (None, True))
+
+    def test_error_class(self):
+        self.assertIsNone(retry.error_class(Response(200)))
+        self.assertEqual(retry.error_class(Response(404)), "HTTP 404")
+        self.assertEqual(retry.error_class(FakeResponse(0.1, "ReadTimeout")), "ReadTimeout")
+
+
+class TestBacklog(unittest.TestCase):
+
+    def test_only_due_articles(self):
+        conn = sqlite3.connect(":memory:")
+        migrations.migrate(conn)
+        conn.executemany("""
+            INSERT INTO articles(url, ts, dl_http, dl_next_ts, dl_parked) VALUES (?, ?, ?, ?, ?)
+        """, [
+            ("new", "2020-05-10T10:00:00", None, None, None),
+            ("due", "2020-05-10T09:00:00", 503, "2020-05-10T11:00:00", None),
+            ("later", "2020-05-10T08:00:00", 503, "2020-05-10T13:00:00", None),
+            ("parked", "2020-05-10T07:00:00", 404, None, 1),
+            ("done", "2020-05-10T06:00:00", 200, None, None),
+        ])
+        rows = conn.execute(BACKLOG_SQL, (NOW.isoformat(),)).fetchall()
+        self.assertEqual([row[0] for row in rows], ["due", "new"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from luechenbresse import db
+from luechenbresse import revisit
+from luechenbresse.adapter import FeedAdapter
+from luechenbresse.download import Downloader
+from luechenbresse.feed import Feed, FakeResponse
+
+PAGE = """<html><head><script>var ad = "{ad}";</script></head><body>
+<h1>Titel</h1><article><p>{text}</p></article></body></html>
+"""
+
+
+class ArticleFixture(BaseHTTPRequestHandler):
+    # one article, server.text and server.ad can be changed by the test, the ETag follows the HTML
+
+    def do_GET(self):
+        body = PAGE.format(text=self.server.text, ad=self.server.ad).encode()
+        etag = f'"{hash(body)}"'
+        self.server.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestContentHash(unittest.TestCase):
+
+    def test_normalized(self):
+        adapter = FeedAdapter()
+        a = revisit.content_hash(adapter, PAGE.format(text="Ein  Satz.", ad=1))
+        self.assertEqual(a, revisit.content_hash(adapter, PAGE.format(text="Ein\nSatz. ", ad=2)))
+        self.assertNotEqual(a, revisit.content_hash(adapter, PAGE.format(text="Ein anderer Satz.", ad=1)))
+
+    def test_no_text_found(self):
+        adapter = FeedAdapter()
+        a = revisit.content_hash(adapter, "<html><script>x = 1</script><div>Nur  hier</div></html>")
+        self.assertEqual(a, revisit.content_hash(adapter, "<html><script>x = 2</script><div>Nur hier</div></html>"))
+
+    def test_schedule(self):
+        now = datetime(2020, 5, 10, 12, 0, 0)
+        self.assertEqual([revisit.next_revisit(now, k, 3600, 2) - now for k in (1, 2, 3)],
+                         [timedelta(hours=1), timedelta(hours=2), timedelta(hours=4)])
+
+
+class TestRevisits(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = HTTPServer(("127.0.0.1", 0), ArticleFixture)
+        self.server.text, self.server.ad, self.server.requests = "Erste Fassung.", 1, list()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/inland/a.html"
+
+        self.db_file = Path(self.tmp.name) / "revisit.sqlite"
+        self.feed = Feed("revisit", "http://127.0.0.1/rss", "rss", self.db_file, ["db-core.sql"],
+                         adapter=FeedAdapter())
+        two_hours_ago = (datetime.now() - timedelta(hours=2)).isoformat()[:19]
+        self.feed._open_db()
+        with self.feed.conn:
+            self.feed.conn.execute(
+                "INSERT INTO articles(url, title, ts, dl_ts, dl_http, html) VALUES (?, 'A', ?, ?, 200, ?)",
+                (self.url, two_hours_ago, two_hours_ago, PAGE.format(text="Erste Fassung.", ad=0)))
+        self.feed._close_db()
+
+        self.revisits = revisit.Revisits()
+        self.revisits.first, self.revisits.factor, self.revisits.max_age_days = 3600, 2, 7
+        self.downloader = Downloader(concurrency=2, rate=1000, burst=10)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        db.close(self.db_file)
+        self.tmp.cleanup()
+
+    def query(self, sql):
+        self.feed._open_db()
+        rows = self.feed.conn.execute(sql).fetchall()
+        self.feed._close_db()
+        return rows
+
+    def due_again(self):
+        self.feed._open_db()
+        with self.feed.conn:
+            self.feed.conn.execute("UPDATE article_revisits SET next_ts = '2000-01-01T00:00:00'")
+        self.feed._close_db()
+
+    def test_only_changes_are_stored(self):
+        # other ads, same text: no revision
+        self.server.ad = 2
+        self.assertEqual(self.revisits.run([self.feed], self.downloader), {"revisit": (1, 0)})
+        self.assertEqual(self.query("SELECT count(*) FROM article_revisions"), [(0,)])
+        # not due before the next revisit
+        self.assertEqual(self.revisits.run([self.feed], self.downloader), {"revisit": (0, 0)})
+
+        # unchanged: conditional GET, 304
+        self.due_again()
+        self.assertEqual(self.revisits.run([self.feed], self.downloader), {"revisit": (1, 0)})
+        self.assertEqual(self.server.requests[0], None)
+        self.assertIsNotNone(self.server.requests[1])
+
+        # edited
+        self.due_again()
+        self.server.text = "Zweite Fassung."
+        self.assertEqual(self.revisits.run([self.feed], self.downloader), {"revisit": (1, 1)})
+        revisions = self.query("SELECT url, html FROM article_revisions")
+        self.assertEqual(len(revisions), 1)
+        self.assertIn("Zweite Fassung.", revisions[0][1])
+        self.assertEqual(self.query("SELECT checks, changes FROM article_revisits"), [(3, 1)])
+        # the first version stays
+        self.assertIn("Erste Fassung.", self.query("SELECT html FROM articles")[0][0])
+
+    def test_batch_run_keeps_first_version(self):
+        r = FakeResponse(0.1)
+        r.status_code, r.text, r.response_time = 200, "<html>überschrieben</html>", 0.1
+        self.feed._open_db()
+        self.feed._store_download({"url": self.url, "ts": "", "title": "A"}, r, 1, 1)
+        self.feed._close_db()
+        self.assertIn("Erste Fassung.", self.query("SELECT html FROM articles")[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
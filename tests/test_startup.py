@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import sys
+import json
+import unittest
+import tempfile
+import subprocess
+from pathlib import Path
+
+HEAVY = ["requests", "feedparser", "bs4", "tracemalloc", "pyarrow"]
+
+
+def loaded_after(statement):
+    # heavy modules in sys.modules after running statement in a fresh interpreter
+    code = f"import sys, json; {statement}; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_feed_module_is_light(self):
+        self.assertEqual(loaded_after("import luechenbresse.feed"), [])
+
+    def test_housekeeping_modules_are_light(self):
+        modules = ["dotfolder", "parse", "wordcount", "kwic", "export", "metrics", "legacy", "matcher"]
+        statement = "; ".join(f"import luechenbresse.{m}" for m in modules)
+        self.assertEqual(loaded_after(statement), [])
+
+
+class TestInit(unittest.TestCase):
+
+    def test_init_and_command_in_one_run(self):
+        # --init writes the database folder after LogManager has read the ini
+        script = Path(__file__).resolve().parent.parent / "bin" / "luechenbresse"
+        with tempfile.TemporaryDirectory() as home:
+            env = dict(os.environ, HOME=home)
+            subprocess.run([sys.executable, str(script), "--init", "--parse"], env=env, check=True,
+                           capture_output=True)
+            log = (Path(home) / ".luechenbresse" / "default.log").read_text()
+        self.assertNotIn("Sorry.", log)
+        self.assertNotIn("No database folder", log)
+        self.assertIn("Setting database location to", log)
+        self.assertIn("zdf-heute: parsed 0 articles", log)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import sys
 import unittest
 from luechenbresse import text
 
@@ -99,6 +100,31 @@ class TestSJoin(unittest.TestCase):
         u = "A B C D"
         self.assertEqual(x, u)
 
+class TestWords(unittest.TestCase):
+
+    def test_is_a_generator(self):
+        g = text.words("A B", ["C"])
+        self.assertEqual(next(g), "A")
+        self.assertEqual(list(g), ["B", "C"])
+
+    def test_same_as_join(self):
+        t = [["+A /B C+", ["D"], [["E", "F"]], ["X-", ";Y"], "-Z"], ("U. V.", " ...")]
+        self.assertEqual(list(text.words(t)), text.flatten(text.undecorate(t)))
+
+    def test_empty(self):
+        self.assertEqual(list(text.words()), [])
+        self.assertEqual(list(text.words([], [[]], " ... ")), [])
+
+    def test_deep_nesting_does_not_hit_recursion_limit(self):
+        t = "Tief"
+        for _ in range(sys.getrecursionlimit() * 2):
+            t = [t, "+"]
+        self.assertEqual(text.join(t), ["Tief"])
+        self.assertEqual(text.flatten(t).count("+"), sys.getrecursionlimit() * 2)
+        u = text.undecorate(t)
+        self.assertEqual(u[1], [])
+
+
 class TestContext(unittest.TestCase):
 
     NUMBERS = "null eins zwei drei vier fünf sechs sieben acht neun zehn elf zwölf dreiz vierz fünfz".split()
@@ -204,6 +230,35 @@ class TestContext(unittest.TestCase):
         self.assertEqual(ctx[offset], self.NUMBERS[15][0])
 
 
+class TestJoinLikeBefore(unittest.TestCase):
+    # the recursive implementation before words(), timing in benchmarks/bench_text.py
+
+    @staticmethod
+    def _undecorate(mixup):
+        if isinstance(mixup, list) or isinstance(mixup, tuple):
+            l = [TestJoinLikeBefore._undecorate(s) for s in mixup]
+        else:
+            l = [word.strip(text._DECORATORS) for word in mixup.split(" ") if word != ""]
+        return [e for e in l if e != ""]
+
+    @staticmethod
+    def _flatten(mixup):
+        if isinstance(mixup, str):
+            return mixup
+        l = list()
+        for y in mixup:
+            f = TestJoinLikeBefore._flatten(y)
+            if isinstance(f, str):
+                l.append(f)
+            else:
+                l.extend(f)
+        return l
+
+    def test_same_words_as_recursive_version(self):
+        article = [["Titel: Kim Jong Un", ["Absatz eins, mit Text.", ["Zitat „so“ oder so."]]] * 20] * 20
+        self.assertEqual(self._flatten(self._undecorate(article)), text.join(article))
+
+
 if __name__ == '__main__':
     unittest.main()
 
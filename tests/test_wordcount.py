@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import unittest
+import sqlite3
+from luechenbresse import migrations
+from luechenbresse import wordcount
+
+
+class TestWordcount(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        migrations.migrate(self.conn)
+
+    def parsed(self, url, calweek, plain, parser=1):
+        self.conn.execute("""
+            INSERT INTO parsed(url, calweek, plain, parser) VALUES (?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET calweek = excluded.calweek, plain = excluded.plain, parser = excluded.parser
+        """, (url, calweek, plain, parser))
+        self.conn.commit()
+
+    def counts(self, calweek):
+        return {
+            row[0]: (row[1], row[2])
+            for row in self.conn.execute("SELECT word, cnt_occ, cnt_art FROM words_by_week WHERE calweek = ?", (calweek,))
+        }
+
+    def test_counts_occurrences_and_articles(self):
+        self.parsed("a", "2020.19", "Kim Jong Un Kim")
+        self.parsed("b", "2020.19", "Kim sagt")
+        self.assertEqual(wordcount.update(self.conn), 2)
+        c = self.counts("2020.19")
+        self.assertEqual(c["Kim"], (3, 2))
+        self.assertEqual(c["sagt"], (1, 1))
+
+    def test_is_incremental(self):
+        self.parsed("a", "2020.19", "Kim")
+        wordcount.update(self.conn)
+        self.assertEqual(wordcount.update(self.conn), 0)
+        self.parsed("b", "2020.19", "Kim")
+        self.assertEqual(wordcount.update(self.conn), 1)
+        self.assertEqual(self.counts("2020.19")["Kim"], (2, 2))
+
+    def test_new_parser_version_rebuilds_only_its_week(self):
+        self.parsed("a", "2020.19", "Kim")
+        self.parsed("b", "2020.20", "Trump")
+        wordcount.update(self.conn, chunk_size=1)
+        self.conn.execute("UPDATE words_by_week SET cnt_occ = 99 WHERE calweek = '2020.20'")
+        self.conn.commit()
+        self.parsed("a", "2020.19", "Merkel", parser=2)
+        wordcount.update(self.conn)
+        self.assertEqual(self.counts("2020.19"), {"Merkel": (1, 1)})
+        self.assertEqual(self.counts("2020.20"), {"Trump": (99, 1)})
+
+    def test_rebuild_week(self):
+        self.parsed("a", "2020.19", "Kim Kim")
+        wordcount.update(self.conn)
+        self.conn.execute("DELETE FROM words_by_week")
+        self.conn.commit()
+        wordcount.rebuild_week(self.conn, "2020.19")
+        self.assertEqual(self.counts("2020.19"), {"Kim": (2, 1)})
+
+
+if __name__ == '__main__':
+    unittest.main()